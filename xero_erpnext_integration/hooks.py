@@ -48,15 +48,28 @@ doctype_js = {
 	"Sales Invoice": "xero_erpnext_integration/custom_scripts/sales_invoice.js",
 	"Payment Entry": "xero_erpnext_integration/custom_scripts/payment_entry.js",
 }
+doctype_list_js = {
+	"Contact": "xero_erpnext_integration/custom_scripts/contact_list.js",
+	"Sales Invoice": "xero_erpnext_integration/custom_scripts/sales_invoice_list.js",
+}
 
 scheduler_events = {
 	"cron": {
 		"0 */2 * * *": [
 			"xero_erpnext_integration.xero_erpnext_integration.apis.sales_invoice.sync_invoice_payments"
 		],
-		"*/30 * * * *": [
+		"0 */4 * * *": [
 			"xero_erpnext_integration.xero_erpnext_integration.schedulers.voided_invoice_sync.sync_voided_invoices"
 		],
+		"15 * * * *": ["xero_erpnext_integration.xero_erpnext_integration.apis.contact.sync_xero_contacts"],
+		"30 2 * * *": [
+			"xero_erpnext_integration.xero_erpnext_integration.apis.contact_reconciliation.reconcile_contacts_with_xero"
+		],
+		"*/5 * * * *": [
+			"xero_erpnext_integration.xero_erpnext_integration.apis.webhook.requeue_webhook_inbox"
+		],
+		"* * * * *": ["xero_erpnext_integration.xero_erpnext_integration.apis.api_log.flush_api_logs"],
+		"45 3 * * *": ["xero_erpnext_integration.xero_erpnext_integration.apis.api_log.purge_api_logs"],
 	},
 }
 
@@ -66,7 +79,27 @@ doc_events = {
 		# "on_submit": "xero_erpnext_integration.xero_erpnext_integration.custom_scripts.sales_invoice.on_submit",
 		"on_cancel": "xero_erpnext_integration.xero_erpnext_integration.custom_scripts.sales_invoice.on_cancel",
 		# "before_submit": "xero_erpnext_integration.xero_erpnext_integration.custom_scripts.sales_invoice.before_submit",
-	}
+	},
+	"Contact": {
+		"on_update": "xero_erpnext_integration.xero_erpnext_integration.apis.contact.invalidate_customer_contact_ids",
+		"on_trash": "xero_erpnext_integration.xero_erpnext_integration.apis.contact.invalidate_customer_contact_ids",
+	},
+	"Account": {
+		"on_update": [
+			"xero_erpnext_integration.xero_erpnext_integration.apis.reference_data.clear_account_code_map",
+			"xero_erpnext_integration.xero_erpnext_integration.apis.payment_accounts.clear_payment_accounts",
+		],
+		"on_trash": [
+			"xero_erpnext_integration.xero_erpnext_integration.apis.reference_data.clear_account_code_map",
+			"xero_erpnext_integration.xero_erpnext_integration.apis.payment_accounts.clear_payment_accounts",
+		],
+	},
+	"Company": {
+		"on_update": "xero_erpnext_integration.xero_erpnext_integration.apis.payment_accounts.clear_payment_accounts",
+	},
+	"Customer": {
+		"on_update": "xero_erpnext_integration.xero_erpnext_integration.apis.payment_accounts.clear_payment_accounts",
+	},
 }
 
 fixtures = [
@@ -268,6 +301,7 @@ fixtures = [
 # Automatically update python controller files with type annotations for this app.
 # export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+	"Xero Webhook Event": 7,
+	"Xero Sync Run": 90,
+}
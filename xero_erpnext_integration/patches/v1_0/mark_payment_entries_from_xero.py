@@ -0,0 +1,33 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+
+def execute():
+	"""
+	Flag Payment Entries recorded from Xero before the "Created from Xero" field existed,
+	so the bulk payment push never sends them back to Xero as new payments.
+	"""
+	# Fixtures are synced after patches, so the field may not exist yet
+	create_custom_field(
+		"Payment Entry",
+		{
+			"fieldname": "custom_from_xero",
+			"fieldtype": "Check",
+			"label": "Created from Xero",
+			"insert_after": "custom_xero_payment_id",
+			"read_only": 1,
+			"no_copy": 1,
+			"module": "Xero Erpnext Integration",
+		},
+	)
+
+	payment_entry = frappe.qb.DocType("Payment Entry")
+	(
+		frappe.qb.update(payment_entry)
+		.set(payment_entry.custom_from_xero, 1)
+		.where(payment_entry.payment_type == "Receive")
+		.where(
+			payment_entry.reference_no.like("Xero-%")
+			| payment_entry.remarks.like("Payment synced from Xero%")
+		)
+	).run()
@@ -0,0 +1,389 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import zlib
+
+import frappe
+from frappe.utils import add_days, cint, flt, getdate, now, now_datetime
+
+from .tracing import traced
+
+# Redis list of Xero API Log entries waiting to be written
+API_LOG_BUFFER_KEY = "xero_api_log_buffer"
+
+# A flush job is queued whenever the buffer grows by this many entries
+FLUSH_THRESHOLD = 200
+
+# Entries written per bulk insert
+FLUSH_BATCH_SIZE = 500
+
+DEFAULT_MAX_BODY_SIZE = 10000
+
+DEFAULT_ERROR_RETENTION_DAYS = 90
+DEFAULT_SUCCESS_RETENTION_DAYS = 7
+
+# Rows deleted per statement, and per transaction, by the retention job
+PURGE_BATCH_SIZE = 1000
+
+# SQL condition selecting each outcome class of logged calls
+OUTCOME_CONDITIONS = {
+	"Success": "coalesce(status_code, '') between '200' and '399'",
+	"Error": "coalesce(status_code, '') not between '200' and '399'",
+}
+
+# Xero resource IDs, replaced in summarized endpoints so calls group per resource type
+GUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+API_LOG_FIELDS = [
+	"api_method",
+	"api_url",
+	"message",
+	"status_code",
+	"timestamp",
+	"attempts",
+	"duration_ms",
+	"xero_correlation_id",
+	"headers",
+	"payload",
+	"response",
+	"payload_body",
+	"response_body",
+]
+
+API_LOG_BODY_FIELDS = ["encoding", "size", "data"]
+
+# zlib level of stored bodies; JSON gains little from the slower levels above it
+BODY_COMPRESSION_LEVEL = 6
+
+
+def new_request_id():
+	"""ID of one Xero API call, used as the name of its Xero API Log"""
+	return frappe.generate_hash(length=16)
+
+
+def should_log(settings, status_code):
+	"""Errors are always logged, successes at the configured sample rate"""
+	if not settings.debug_mode:
+		return False
+
+	if not status_code or status_code >= 400:
+		return True
+
+	sample_rate = (
+		100 if settings.api_log_success_sample_rate is None else flt(settings.api_log_success_sample_rate)
+	)
+	return random.random() * 100 < sample_rate
+
+
+def encode(value, max_size):
+	"""Compact JSON (or the raw text) of a log body, cut to max_size characters"""
+	if value in (None, "", {}):
+		return ""
+
+	text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"), default=str)
+	if len(text) > max_size:
+		text = f"{text[:max_size]}...[truncated {len(text) - max_size} chars]"
+
+	return text
+
+
+def build_api_log(
+	settings,
+	method,
+	url,
+	headers,
+	payload,
+	response,
+	request_id=None,
+	attempts=1,
+	duration_ms=None,
+	error=None,
+):
+	"""
+	Build the single Xero API Log entry of a call, without re-parsing the response body.
+
+	With Compress Bodies on, the payload and response go to Xero API Log Body instead,
+	compressed and keyed by content hash, and the entry carries them under "bodies".
+	"""
+	max_size = cint(settings.api_log_max_body_size) or DEFAULT_MAX_BODY_SIZE
+	status_code = response.status_code if response is not None else None
+
+	message = "No Response"
+	if status_code:
+		message = "Error" if status_code >= 400 else "Redirect" if status_code >= 300 else "Success"
+
+	entry = {
+		"request_id": request_id or new_request_id(),
+		"api_method": method,
+		"api_url": url,
+		"message": message,
+		"status_code": str(status_code or ""),
+		"timestamp": now(),
+		"attempts": attempts,
+		"duration_ms": duration_ms,
+		"xero_correlation_id": response.headers.get("Xero-Correlation-Id") if response is not None else None,
+		"headers": encode(mask_headers(headers), max_size),
+		"payload": encode(payload, max_size),
+		"response": encode(response.text if response is not None else str(error or ""), max_size),
+	}
+
+	if cint(settings.api_log_compress_bodies):
+		bodies = {}
+		for field in ("payload", "response"):
+			entry[f"{field}_body"] = compress_body(entry.pop(field), bodies)
+		entry["bodies"] = bodies
+
+	return entry
+
+
+def compress_body(text, bodies):
+	"""Add a compressed log body to bodies, keyed by its SHA-256, and return the key"""
+	if not text:
+		return None
+
+	raw = text.encode()
+	key = hashlib.sha256(raw).hexdigest()
+	if key not in bodies:
+		data = base64.b64encode(zlib.compress(raw, BODY_COMPRESSION_LEVEL)).decode()
+		bodies[key] = {"encoding": "zlib", "size": len(raw), "data": data}
+
+	return key
+
+
+def read_api_log_body(name):
+	"""Inflate a stored Xero API Log Body"""
+	body = frappe.db.get_value("Xero API Log Body", name, ["encoding", "data"], as_dict=True)
+	if not body:
+		return ""
+
+	data = base64.b64decode(body.data)
+	return (zlib.decompress(data) if body.encoding == "zlib" else data).decode()
+
+
+def mask_headers(headers):
+	"""Copy of the request headers with credentials masked"""
+	masked = dict(headers or {})
+	authorization = masked.get("Authorization")
+	if authorization:
+		masked["Authorization"] = f"{authorization.split(' ', 1)[0]} ***MASKED***"
+	return masked
+
+
+def buffer_api_log(entry):
+	"""Queue a log entry in Redis; a flush job writes the buffer in bulk"""
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	pipeline.rpush(cache.make_key(API_LOG_BUFFER_KEY), json.dumps(entry, separators=(",", ":")))
+	(length,) = pipeline.execute()
+
+	if length % FLUSH_THRESHOLD == 0:
+		frappe.enqueue(
+			"xero_erpnext_integration.xero_erpnext_integration.apis.api_log.flush_api_logs",
+			queue="short",
+			job_id="xero_api_log_flush",
+			deduplicate=True,
+		)
+
+
+def flush_api_logs():
+	"""Write buffered Xero API Log entries with bulk inserts"""
+	cache = frappe.cache()
+	key = cache.make_key(API_LOG_BUFFER_KEY)
+
+	while True:
+		# Take a batch off the head of the list atomically
+		pipeline = cache.pipeline()
+		pipeline.lrange(key, 0, FLUSH_BATCH_SIZE - 1)
+		pipeline.ltrim(key, FLUSH_BATCH_SIZE, -1)
+		entries, _trimmed = pipeline.execute()
+		if not entries:
+			return
+
+		try:
+			write_api_logs([json.loads(entry) for entry in entries])
+			frappe.db.commit()
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error("Xero API Log Flush", f"Dropped {len(entries)} API log entries: {str(e)}")
+
+
+@traced("xero.api_log.flush")
+def write_api_logs(entries):
+	timestamp = now()
+	user = frappe.session.user
+
+	# Identical bodies share one row, however many calls returned them
+	bodies = {}
+	for entry in entries:
+		bodies.update(entry.get("bodies") or {})
+	if bodies:
+		frappe.db.bulk_insert(
+			"Xero API Log Body",
+			["name", "creation", "modified", "owner", "modified_by", *API_LOG_BODY_FIELDS],
+			[
+				[key, timestamp, timestamp, user, user, *(body[field] for field in API_LOG_BODY_FIELDS)]
+				for key, body in bodies.items()
+			],
+			ignore_duplicates=True,
+		)
+
+	frappe.db.bulk_insert(
+		"Xero API Log",
+		["name", "creation", "modified", "owner", "modified_by", *API_LOG_FIELDS],
+		[
+			[
+				entry["request_id"],
+				timestamp,
+				timestamp,
+				user,
+				user,
+				*(entry.get(field) for field in API_LOG_FIELDS),
+			]
+			for entry in entries
+		],
+	)
+
+
+def purge_api_logs():
+	"""
+	Apply the Xero API Log retention policy: errors and successes are each kept for
+	their own number of days.
+
+	Expired rows go in batches of PURGE_BATCH_SIZE, each in its own transaction, so the
+	job never holds long locks. With Keep Daily Summary on, each batch is rolled up into
+	Xero API Log Summary before it is deleted.
+	"""
+	settings = frappe.get_single("Xero Settings")
+	retention = {
+		"Success": cint(settings.api_log_success_retention_days) or DEFAULT_SUCCESS_RETENTION_DAYS,
+		"Error": cint(settings.api_log_error_retention_days) or DEFAULT_ERROR_RETENTION_DAYS,
+	}
+
+	for outcome, days in retention.items():
+		cutoff = add_days(now_datetime(), -days)
+		while True:
+			rows = frappe.db.sql(
+				f"""
+				select name, timestamp, api_method, api_url, attempts, duration_ms
+				from `tabXero API Log`
+				where timestamp < %(cutoff)s and {OUTCOME_CONDITIONS[outcome]}
+				order by timestamp
+				limit %(limit)s
+				""",
+				{"cutoff": cutoff, "limit": PURGE_BATCH_SIZE},
+				as_dict=True,
+			)
+			if not rows:
+				break
+
+			try:
+				if cint(settings.api_log_daily_summary):
+					summarize_api_logs(rows, outcome)
+				frappe.db.delete("Xero API Log", {"name": ["in", [row.name for row in rows]]})
+				frappe.db.commit()
+			except Exception as e:
+				frappe.db.rollback()
+				frappe.log_error("Xero API Log Retention", f"Error purging {outcome} API logs: {str(e)}")
+				return
+
+			if len(rows) < PURGE_BATCH_SIZE:
+				break
+
+	purge_api_log_bodies()
+
+
+def purge_api_log_bodies():
+	"""Delete stored bodies no Xero API Log refers to any more, in batches"""
+	while True:
+		names = frappe.db.sql(
+			"""
+			select body.name
+			from `tabXero API Log Body` body
+			where not exists (select 1 from `tabXero API Log` log where log.payload_body = body.name)
+				and not exists (select 1 from `tabXero API Log` log where log.response_body = body.name)
+			limit %(limit)s
+			""",
+			{"limit": PURGE_BATCH_SIZE},
+			pluck=True,
+		)
+		if not names:
+			return
+
+		frappe.db.delete("Xero API Log Body", {"name": ["in", names]})
+		frappe.db.commit()
+
+		if len(names) < PURGE_BATCH_SIZE:
+			return
+
+
+def get_endpoint(url):
+	"""Endpoint of a logged URL, without the API base, query string and resource IDs"""
+	path = (url or "").split("?", 1)[0].split("/api.xro/2.0/", 1)[-1]
+	return GUID_PATTERN.sub("{id}", path)[:140]
+
+
+def summarize_api_logs(rows, outcome):
+	"""Add logged calls to their daily Xero API Log Summary rows"""
+	totals = {}
+	for row in rows:
+		key = (str(getdate(row.timestamp)), row.api_method or "", get_endpoint(row.api_url), outcome)
+		total = totals.setdefault(
+			key, {"requests": 0, "attempts": 0, "total_duration_ms": 0, "max_duration_ms": 0}
+		)
+		total["requests"] += 1
+		total["attempts"] += cint(row.attempts) or 1
+		total["total_duration_ms"] += cint(row.duration_ms)
+		total["max_duration_ms"] = max(total["max_duration_ms"], cint(row.duration_ms))
+
+	# Summary rows are named by their key, so a day keeps one row however many runs touch it
+	names = {key: hashlib.sha1("|".join(key).encode()).hexdigest()[:20] for key in totals}
+	existing = {
+		row.name: row
+		for row in frappe.get_all(
+			"Xero API Log Summary",
+			filters={"name": ["in", list(names.values())]},
+			fields=["name", "requests", "attempts", "total_duration_ms", "max_duration_ms"],
+		)
+	}
+
+	updates = {}
+	inserts = []
+	timestamp = now()
+	user = frappe.session.user
+	for key, total in totals.items():
+		name = names[key]
+		if name in existing:
+			row = existing[name]
+			updates[name] = {
+				"requests": row.requests + total["requests"],
+				"attempts": row.attempts + total["attempts"],
+				"total_duration_ms": row.total_duration_ms + total["total_duration_ms"],
+				"max_duration_ms": max(row.max_duration_ms, total["max_duration_ms"]),
+			}
+		else:
+			inserts.append([name, timestamp, timestamp, user, user, *key, *total.values()])
+
+	if updates:
+		frappe.db.bulk_update("Xero API Log Summary", updates)
+	if inserts:
+		frappe.db.bulk_insert(
+			"Xero API Log Summary",
+			[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"date",
+				"api_method",
+				"endpoint",
+				"outcome",
+				"requests",
+				"attempts",
+				"total_duration_ms",
+				"max_duration_ms",
+			],
+			inserts,
+		)
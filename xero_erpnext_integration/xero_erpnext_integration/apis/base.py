@@ -1,13 +1,56 @@
 import base64
+import contextvars
 import json
-from datetime import datetime, timedelta
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from urllib.parse import urljoin
 
 import frappe
 import requests
 from frappe import _
+from frappe.utils import cint, flt, get_datetime
 from frappe.utils.background_jobs import enqueue
+from redis.exceptions import LockError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..doctype.xero_sync_run.xero_sync_run import count_sync_run_call
+from .api_log import buffer_api_log, build_api_log, new_request_id, should_log
+from .metrics import record_api_call
+from .rate_limiter import XeroRateLimiter, XeroRateLimitError
+from .tracing import SPAN_KIND_CLIENT, set_span_attributes, span, traced
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_TIMEOUT = 30
+MAX_RATE_LIMIT_RETRIES = 3
+DEFAULT_PAGE_SIZE = 100
+
+# Xero creates records on POST and PUT, so only reads and deletes are resent on transport
+# errors, unless the request carries an Idempotency-Key Xero deduplicates it by
+IDEMPOTENT_METHODS = frozenset({"GET", "DELETE"})
+KEYED_METHODS = frozenset({"GET", "DELETE", "POST", "PUT"})
+
+# Characters of comma-separated IDs sent in one query string, well below common URL limits
+MAX_ID_QUERY_LENGTH = 1500
+
+SETTINGS_VERSION_CACHE_KEY = "xero_settings_version"
+TOKEN_CACHE_KEY = "xero_access_token"
+TOKEN_REFRESH_LOCK_KEY = "xero_token_refresh_lock"
+TOKEN_REFRESH_LOCK_TIMEOUT = 60
+
+# Xero refresh tokens expire after 60 days unused, a cached pair older than that is worthless
+TOKEN_CACHE_TTL = 60 * 24 * 60 * 60
+
+# Process-level state shared by every request and background job served by this worker
+_sessions = {}
+_clients = {}
+_lock = threading.Lock()
 
 
 class SupportedHTTPMethod(Enum):
@@ -41,6 +84,22 @@ class XeroAPIClient:
 		self.refresh_token = self.settings.refresh_token
 		self.tenant_id = self.settings.tenant_id
 
+		# Pooled keep-alive HTTP session
+		self.timeout = cint(self.settings.http_timeout) or DEFAULT_TIMEOUT
+		# 0 is a valid setting that turns retries off, only an unset value falls back to the default
+		max_retries = self.settings.http_max_retries
+		session_options = {
+			"pool_size": cint(self.settings.http_pool_size) or DEFAULT_POOL_SIZE,
+			"max_retries": DEFAULT_MAX_RETRIES if max_retries is None else cint(max_retries),
+			"backoff_factor": flt(self.settings.http_backoff_factor) or DEFAULT_BACKOFF_FACTOR,
+		}
+		self.session = get_http_session(**session_options)
+		self.keyed_session = get_http_session(**session_options, retry_methods=KEYED_METHODS)
+		self.settings_version = None
+
+		# Rate budget shared by all workers on the site
+		self.rate_limiter = XeroRateLimiter.from_settings(self.settings)
+
 		# Initialize headers
 		self.headers = {"Content-Type": "application/json", "Accept": "application/json"}
 
@@ -105,7 +164,7 @@ class XeroAPIClient:
 			# Log request details (without sensitive info)
 
 			# Make token request
-			response = requests.post(self.token_url, data=token_data, headers=headers)
+			response = self._send("POST", self.token_url, data=token_data, headers=headers)
 
 			# Log the response status for debugging
 
@@ -141,6 +200,9 @@ class XeroAPIClient:
 				# Update headers with new access token for tenant info call
 				self.access_token = access_token
 				self.headers["Authorization"] = f"Bearer {access_token}"
+				self._cache_token(
+					{"access_token": access_token, "refresh_token": refresh_token, "expires_at": expires_at}
+				)
 
 				# Get tenant information
 				self._get_and_save_tenant_info()
@@ -227,7 +289,7 @@ class XeroAPIClient:
 				return
 
 			# Get connections (tenants)
-			response = requests.get(self.connections_url, headers=self.headers)
+			response = self._send("GET", self.connections_url, headers=self.headers)
 
 			if response.status_code == 200:
 				connections = response.json()
@@ -255,14 +317,41 @@ class XeroAPIClient:
 			frappe.log_error(f"Failed to get tenant info: {str(e)}", "Xero Tenant Info")
 
 	def refresh_access_token(self):
-		"""Refresh access token using refresh token"""
+		"""Refresh access token once for all workers, under a distributed lock"""
+		stale_token = self.access_token
+		cache = frappe.cache()
+
 		try:
-			if not self.refresh_token:
+			with cache.lock(
+				cache.make_key(TOKEN_REFRESH_LOCK_KEY),
+				timeout=TOKEN_REFRESH_LOCK_TIMEOUT,
+				blocking_timeout=TOKEN_REFRESH_LOCK_TIMEOUT,
+			):
+				# Another worker may have refreshed while we waited for the lock
+				token = self._load_token()
+				if (
+					token.get("access_token")
+					and token["access_token"] != stale_token
+					and not self._is_token_expiring(token)
+				):
+					self._use_token(token)
+					return True
+
+				return self._request_token_refresh(token.get("refresh_token"))
+
+		except LockError:
+			frappe.log_error(title="Xero Token Refresh", message="Timed out waiting for token refresh lock")
+			return False
+
+	def _request_token_refresh(self, refresh_token):
+		"""Exchange the refresh token for a new token pair"""
+		try:
+			if not refresh_token:
 				return False
 
 			token_data = {
 				"grant_type": "refresh_token",
-				"refresh_token": self.refresh_token,
+				"refresh_token": refresh_token,
 				"client_id": self.client_id,
 				"client_secret": self.client_secret,
 			}
@@ -274,28 +363,29 @@ class XeroAPIClient:
 				"Content-Type": "application/x-www-form-urlencoded"
 			}
 
-			response = requests.post(self.token_url, data=token_data, headers=headers)
+			response = self._send("POST", self.token_url, data=token_data, headers=headers)
 
 			if response.status_code == 200:
 				token_data = response.json()
 
-				# Update tokens
-				self.settings.access_token = token_data.get("access_token")
-				if token_data.get("refresh_token"):
-					self.settings.refresh_token = token_data.get("refresh_token")
-
-				# Update expiry
+				# Xero rotates refresh tokens, keep the old one only if no new one was issued
 				expires_in = token_data.get("expires_in", 1800)
-				expires_at = datetime.now() + timedelta(seconds=expires_in)
-				self.settings.token_expires_at = expires_at
-
-				# Save settings
-				self.settings.save()
+				token = {
+					"access_token": token_data.get("access_token"),
+					"refresh_token": token_data.get("refresh_token") or refresh_token,
+					"expires_at": datetime.now() + timedelta(seconds=expires_in),
+				}
 
-				# Update headers
-				self.access_token = self.settings.access_token
-				self.headers["Authorization"] = f"Bearer {self.access_token}"
+				# The cache is the source of truth for workers. Xero Settings is written by a job of
+				# its own, so the rotated refresh token is kept even if this job rolls back.
+				self._cache_token(token)
+				frappe.enqueue(
+					"xero_erpnext_integration.xero_erpnext_integration.apis.base.persist_cached_token",
+					queue="short",
+					enqueue_after_commit=False,
+				)
 
+				self._use_token(token)
 				return True
 			else:
 				frappe.log_error(
@@ -308,51 +398,145 @@ class XeroAPIClient:
 			frappe.log_error(title="Xero Token Refresh", message=f"Token refresh error: {str(e)}")
 			return False
 
+	def _load_token(self):
+		"""Get the current token from the cache, seeding it from Xero Settings on a miss"""
+		# Bypass the per-job local cache, another worker may have rotated the token since
+		token = frappe.cache().get_value(TOKEN_CACHE_KEY, expires=True)
+		if token:
+			return token
+
+		values = frappe.db.get_singles_dict("Xero Settings")
+		token = {
+			"access_token": values.get("access_token"),
+			"refresh_token": values.get("refresh_token"),
+			"expires_at": values.get("token_expires_at"),
+		}
+		if token["access_token"]:
+			self._cache_token(token)
+
+		return token
+
+	def _cache_token(self, token):
+		"""Share the token with every worker on the site"""
+		# An expiring key is written to Redis only, never to the per-job local cache
+		frappe.cache().set_value(TOKEN_CACHE_KEY, token, expires_in_sec=TOKEN_CACHE_TTL)
+
+	def _use_token(self, token):
+		"""Switch this client to the given token"""
+		self.access_token = token.get("access_token")
+		self.refresh_token = token.get("refresh_token")
+		self.settings.access_token = self.access_token
+		self.settings.refresh_token = self.refresh_token
+		self.settings.token_expires_at = token.get("expires_at")
+		self.headers["Authorization"] = f"Bearer {self.access_token}"
+
+	def _is_token_expiring(self, token):
+		"""Check whether the token expires in the next 5 minutes"""
+		expires_at = token.get("expires_at")
+		if not expires_at:
+			return False
+
+		if isinstance(expires_at, str):
+			expires_at = datetime.fromisoformat(expires_at)
+
+		return datetime.now() >= expires_at - timedelta(minutes=5)
+
+	@traced("xero.token_check")
 	def _ensure_valid_token(self):
 		"""Ensure we have a valid access token"""
-		if not self.access_token:
+		token = self._load_token()
+		if not token.get("access_token"):
 			frappe.throw(_("No access token available. Please authorize the application."))
 
-		# Check if token is expired
-		if self.settings.token_expires_at:
-			expires_at = self.settings.token_expires_at
-			if isinstance(expires_at, str):
-				expires_at = datetime.fromisoformat(expires_at)
+		if token["access_token"] != self.access_token:
+			self._use_token(token)
+
+		# Refresh if expires in next 5 minutes
+		if self._is_token_expiring(token):
+			if not self.refresh_access_token():
+				frappe.throw(_("Failed to refresh access token. Please re-authorize the application."))
+
+	def _send(self, method, url, **kwargs):
+		"""Send a request through the pooled session"""
+		try:
+			method = SupportedHTTPMethod(method.upper()).value
+		except ValueError:
+			frappe.throw(_("Unsupported HTTP method: {0}").format(method))
+
+		kwargs.setdefault("timeout", self.timeout)
+		session = self.keyed_session if "Idempotency-Key" in (kwargs.get("headers") or {}) else self.session
+		return session.request(method, url, **kwargs)
+
+	def _send_api(self, method, url, trace=None, **kwargs):
+		"""Send an API call within the shared rate budget, waiting out 429 responses"""
+		for _attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+			response = None
+			if trace is not None:
+				trace["attempts"] += 1
+			with span("xero.rate_limit_wait"):
+				slot = self.rate_limiter.acquire()
+			started = time.monotonic()
+			with span("xero.http", SPAN_KIND_CLIENT, **{"http.method": method, "url.full": url}) as http_span:
+				try:
+					response = self._send(method, url, **kwargs)
+				finally:
+					self.rate_limiter.release(slot, response)
+					self._record_metrics(
+						method, url, response, time.monotonic() - started, retry=bool(_attempt), trace=trace
+					)
+				if http_span:
+					http_span.set(**{"http.status_code": response.status_code, "xero.attempt": _attempt + 1})
+
+			# acquire() sleeps until the Retry-After window recorded by release() has passed
+			if response.status_code != 429:
+				break
 
-			# Refresh if expires in next 5 minutes
-			if datetime.now() >= expires_at - timedelta(minutes=5):
-				if not self.refresh_access_token():
-					frappe.throw(_("Failed to refresh access token. Please re-authorize the application."))
+		return response
 
-	def make_request(self, method, endpoint, data=None, params=None):
-		"""Make authenticated request to Xero API"""
+	def _record_metrics(self, method, url, response, seconds, retry=False, trace=None):
+		"""Count the attempt in the Xero API metrics and the sync run in progress; never fails a call"""
+		try:
+			record_api_call(self.tenant_id, method, url, response, seconds, retry=retry)
+			count_sync_run_call(response, seconds)
+		except Exception as e:
+			message = f"Failed to record metrics: {str(e)}"
+			# get_paged worker threads must not use the database; _log_request logs it later
+			if trace is not None:
+				trace.setdefault("errors", []).append(message)
+			else:
+				frappe.log_error(message, "Xero API Metrics")
+
+	@traced("xero.make_request", SPAN_KIND_CLIENT)
+	def make_request(self, method, endpoint, data=None, params=None, headers=None):
+		"""
+		Make authenticated request to Xero API.
+
+		Each call gets a request ID, kept in frappe.local.xero_request_id and quoted in
+		errors. The call is logged once under that ID, with its retries and latency. Writes
+		send it as their Idempotency-Key, so Xero applies a resent POST or PUT only once.
+		"""
+		request_id = new_request_id()
+		frappe.local.xero_request_id = request_id
+		set_span_attributes(**{"xero.request_id": request_id, "xero.endpoint": endpoint})
+		trace = {"attempts": 0, "started": time.monotonic()}
+		url = f"{self.base_url}/{endpoint.lstrip('/')}"
+		request_headers = dict(headers or {})
 		response = None
+		error = None
+
 		try:
 			# Ensure valid token
 			self._ensure_valid_token()
 
-			# Build URL
-			url = f"{self.base_url}/{endpoint.lstrip('/')}"
-
 			# Prepare request
-			request_headers = self.headers.copy()
-
-			# Log request
+			request_headers = {**self.headers, **(headers or {})}
+			if method.upper() in ("POST", "PUT"):
+				request_headers.setdefault("Idempotency-Key", request_id)
 
 			# Make request
-			if method.upper() == "GET":
-				response = requests.get(url, headers=request_headers, params=params)
-			elif method.upper() == "POST":
-				response = requests.post(url, headers=request_headers, json=data, params=params)
-			elif method.upper() == "PUT":
-				response = requests.put(url, headers=request_headers, json=data, params=params)
-			elif method.upper() == "DELETE":
-				response = requests.delete(url, headers=request_headers, params=params)
-			else:
-				frappe.throw(_("Unsupported HTTP method: {0}").format(method))
-
-			# Log response
-			self._log_request(method, url, data, params, response)
+			response = self._send_api(
+				method, url, trace=trace, headers=request_headers, json=data, params=params
+			)
 
 			# Handle response
 			if response.status_code in [200, 201]:
@@ -360,20 +544,18 @@ class XeroAPIClient:
 					return response.json()
 				except:
 					return {"message": "Success", "data": response.text}
+			elif response.status_code == 304:
+				# Nothing changed since If-Modified-Since
+				return {}
 			elif response.status_code == 401:
 				# Try to refresh token and retry once
 				if self.refresh_access_token():
 					request_headers["Authorization"] = f"Bearer {self.access_token}"
 
 					# Retry request
-					if method.upper() == "GET":
-						response = requests.get(url, headers=request_headers, params=params)
-					elif method.upper() == "POST":
-						response = requests.post(url, headers=request_headers, json=data, params=params)
-					elif method.upper() == "PUT":
-						response = requests.put(url, headers=request_headers, json=data, params=params)
-					elif method.upper() == "DELETE":
-						response = requests.delete(url, headers=request_headers, params=params)
+					response = self._send_api(
+						method, url, trace=trace, headers=request_headers, json=data, params=params
+					)
 
 					if response.status_code in [200, 201]:
 						try:
@@ -382,15 +564,136 @@ class XeroAPIClient:
 							return {"message": "Success", "data": response.text}
 
 				frappe.throw(_("Authentication failed. Please re-authorize the application."))
+			elif response.status_code == 429:
+				raise XeroRateLimitError(
+					f"Xero rate limit exceeded: {response.headers.get('X-Rate-Limit-Problem', 'unknown')} (request {request_id})",
+					retry_after=flt(response.headers.get("Retry-After")),
+				)
 			else:
-				error_msg = f"API request failed: {response.status_code} - {response.text}"
+				error_msg = (
+					f"API request failed: {response.status_code} - {response.text} (request {request_id})"
+				)
 				frappe.throw(_(error_msg))
 
 		except Exception as e:
-			self._log_response(response)
-			frappe.log_error(title="Xero API Request", message=f"API request failed: {str(e)}")
+			error = e
+			# With Debug Mode on the API log below already records the failure
+			if not self.settings.debug_mode:
+				frappe.log_error(
+					title="Xero API Request", message=f"API request {request_id} failed: {str(e)}"
+				)
 			raise
 
+		finally:
+			self._log_request(method, url, data, params, response, request_headers, request_id, trace, error)
+
+	def get_paged(
+		self, endpoint, collection, params=None, ids=None, id_param="IDs", page_size=None, headers=None
+	):
+		"""
+		Yield every record of a paged Xero endpoint.
+
+		ID lists are split into URL-safe chunks and each chunk walks page/pageSize until a
+		short page comes back. Chunks are fetched concurrently, up to the concurrency limit
+		of the rate budget; logging and error handling stay on the calling thread.
+		"""
+		page_size = page_size or DEFAULT_PAGE_SIZE
+		queries = [dict(params or {})]
+		if ids is not None:
+			queries = [{**(params or {}), id_param: ",".join(chunk)} for chunk in chunk_ids(ids)]
+
+		if not queries:
+			return
+
+		self._ensure_valid_token()
+		url = f"{self.base_url}/{endpoint.lstrip('/')}"
+		request_headers = {**self.headers, **(headers or {})}
+
+		workers = min(len(queries), self.rate_limiter.concurrency)
+		if workers <= 1:
+			for query in queries:
+				pages = self._fetch_pages(url, request_headers, query, collection, page_size)
+				yield from self._collect_pages(endpoint, url, pages, collection, page_size, headers)
+			return
+
+		# Worker threads share the site context of this job, but only touch Redis and HTTP. The
+		# span decides trace sampling here, so the workers inherit it instead of reading settings.
+		with (
+			span("xero.get_paged", **{"xero.endpoint": endpoint, "xero.chunks": len(queries)}),
+			ThreadPoolExecutor(max_workers=workers) as executor,
+		):
+			futures = [
+				executor.submit(
+					contextvars.copy_context().run,
+					self._fetch_pages,
+					url,
+					request_headers,
+					query,
+					collection,
+					page_size,
+				)
+				for query in queries
+			]
+			results = [future.result() for future in as_completed(futures)]
+
+		# Logging, token refresh and error handling stay on the calling thread
+		for pages in results:
+			yield from self._collect_pages(endpoint, url, pages, collection, page_size, headers)
+
+	def _fetch_pages(self, url, headers, query, collection, page_size):
+		"""Walk the pages of one query, stopping at the last page or the first failed response"""
+		pages = []
+		page = 1
+
+		while True:
+			params = {**query, "page": page, "pageSize": page_size}
+			trace = {"attempts": 0, "started": time.monotonic()}
+			response = self._send_api("GET", url, trace=trace, headers=headers, params=params)
+			trace["duration_ms"] = int((time.monotonic() - trace["started"]) * 1000)
+
+			records = None
+			if response.status_code == 304:
+				records = []
+			elif response.status_code == 200:
+				try:
+					records = response.json().get(collection, [])
+				except ValueError:
+					records = None
+
+			pages.append((params, response, records, trace))
+			if records is None or len(records) < page_size:
+				return pages
+
+			page += 1
+
+	def _collect_pages(self, endpoint, url, pages, collection, page_size, headers=None):
+		"""Log fetched pages under their own request IDs and yield their records, redoing a failed page"""
+		for params, response, records, trace in pages:
+			if records is not None:
+				self._log_request(
+					"GET",
+					url,
+					None,
+					params,
+					response,
+					{**self.headers, **(headers or {})},
+					new_request_id(),
+					trace,
+				)
+				yield from records
+				continue
+
+			# Token refresh, rate limit and error handling of a failed page
+			page = params["page"]
+			while True:
+				result = self.make_request("GET", endpoint, params={**params, "page": page}, headers=headers)
+				records = result.get(collection, []) if result else []
+				yield from records
+
+				if len(records) < page_size:
+					return
+				page += 1
+
 	def test_connection(self):
 		"""Test connection to Xero API"""
 		try:
@@ -467,81 +770,167 @@ class XeroAPIClient:
 			frappe.log_error(f"Failed to get payments: {str(e)}", "Xero Get Payments")
 			return []
 
-	def _log_request(self, method, url, data, params, response):
-		"""Log API request"""
-		if not self.settings.debug_mode:
-			return
+	@traced("xero.api_log.write")
+	def _log_request(
+		self, method, url, data, params, response, headers=None, request_id=None, trace=None, error=None
+	):
+		"""Buffer one API log entry per call; errors always, successes at the configured sample rate"""
+		for message in (trace or {}).get("errors", []):
+			frappe.log_error(message, "Xero API Metrics")
 
 		try:
-			# Determine message based on response status
-			message = "Success"
-			if response:
-				if response.status_code >= 400:
-					message = "Error"
-				elif response.status_code >= 300:
-					message = "Redirect"
-			else:
-				message = "No Response"
-
-			# Prepare headers for logging (exclude sensitive information)
-			headers_to_log = self.headers.copy()
-			if "Authorization" in headers_to_log:
-				# Mask the token for security
-				auth_header = headers_to_log["Authorization"]
-				if "Bearer" in auth_header:
-					headers_to_log["Authorization"] = "Bearer ***MASKED***"
-				elif "Basic" in auth_header:
-					headers_to_log["Authorization"] = "Basic ***MASKED***"
-
-			log_data = {
-				"doctype": "Xero API Log",
-				"api_method": method,
-				"api_url": url,
-				"message": message,
-				"headers": json.dumps(headers_to_log, indent=2),
-				"payload": json.dumps({"data": data, "params": params}, indent=2) if (data or params) else "",
-				"timestamp": frappe.utils.now(),
-				"status_code": str(response.status_code) if response else "",
-				"response": json.dumps(response.json(), indent=2)
-				if response and response.status_code < 400
-				else (response.text if response else ""),
-			}
+			if not should_log(self.settings, response.status_code if response is not None else None):
+				return
 
-			frappe.get_doc(log_data).insert(ignore_permissions=True)
+			payload = {"data": data, "params": params} if (data or params) else None
+			buffer_api_log(
+				build_api_log(
+					self.settings,
+					method,
+					url,
+					headers or self.headers,
+					payload,
+					response,
+					request_id=request_id,
+					attempts=trace["attempts"] if trace else 1,
+					duration_ms=trace.get("duration_ms", int((time.monotonic() - trace["started"]) * 1000))
+					if trace
+					else None,
+					error=error,
+				)
+			)
 
 		except Exception as e:
 			frappe.log_error(f"Failed to log request: {str(e)}", "Xero Request Log")
 			return
 
-	def _log_response(self, response):
-		"""Log API response"""
-		if not self.settings.debug_mode:
-			return
-
-		try:
-			# Find the most recent log entry to update
-			logs = frappe.get_all(
-				"Xero API Log", filters={"tenant_id": self.tenant_id}, order_by="creation desc", limit=1
-			)
-
-			if logs:
-				log_doc = frappe.get_doc("Xero API Log", logs[0].name)
-				log_doc.status_code = str(response.status_code)
-				log_doc.message = "Success" if response.status_code < 400 else "Error"
 
-				try:
-					log_doc.response_data = json.dumps(response.json(), indent=2)
-				except:
-					log_doc.response_data = response.text
-
-				log_doc.save(ignore_permissions=True)
+def get_http_session(
+	pool_size=DEFAULT_POOL_SIZE,
+	max_retries=DEFAULT_MAX_RETRIES,
+	backoff_factor=DEFAULT_BACKOFF_FACTOR,
+	retry_methods=IDEMPOTENT_METHODS,
+):
+	"""
+	Get a pooled keep-alive session for this worker process.
 
-		except Exception as e:
-			frappe.log_error(f"Failed to log response: {str(e)}", "Xero Response Log")
+	Connections to api.xero.com and identity.xero.com are kept open between calls, so
+	only the first request of a worker pays for the TCP and TLS handshake. Requests with
+	one of `retry_methods` are retried on connection errors and 5xx responses; 429 is left
+	to the caller.
+	"""
+	key = (pool_size, max_retries, backoff_factor, retry_methods)
+	session = _sessions.get(key)
+	if session:
+		return session
+
+	with _lock:
+		session = _sessions.get(key)
+		if session:
+			return session
+
+		retry = Retry(
+			total=max_retries,
+			backoff_factor=backoff_factor,
+			status_forcelist=(500, 502, 503, 504),
+			allowed_methods=retry_methods,
+			raise_on_status=False,
+		)
+		adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+		session = requests.Session()
+		session.mount("https://", adapter)
+		session.mount("http://", adapter)
+		_sessions[key] = session
+
+	return session
+
+
+def chunk_ids(ids, max_length=MAX_ID_QUERY_LENGTH):
+	"""Split IDs into chunks whose comma-joined length fits in a query string"""
+	chunk = []
+	length = 0
+
+	for xero_id in dict.fromkeys(ids):
+		if chunk and length + len(xero_id) + 1 > max_length:
+			yield chunk
+			chunk = []
+			length = 0
+
+		chunk.append(xero_id)
+		length += len(xero_id) + 1
+
+	if chunk:
+		yield chunk
+
+
+def parse_xero_date(value):
+	"""Parse a Xero date, either /Date(1234567890000+0000)/ or ISO 8601, as a naive UTC datetime"""
+	if not value:
+		return None
+
+	date_match = re.search(r"/Date\((-?\d+)", value)
+	if date_match:
+		timestamp = int(date_match.group(1)) / 1000
+		return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+	try:
+		return get_datetime(value)
+	except Exception:
+		return None
+
+
+def if_modified_since(watermark):
+	"""Build the If-Modified-Since header for a UTC watermark"""
+	if not watermark:
+		return {}
+	return {"If-Modified-Since": get_datetime(watermark).strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def get_settings_version():
+	"""Get the current Xero Settings version shared by all workers on the site"""
+	version = frappe.cache().get_value(SETTINGS_VERSION_CACHE_KEY)
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache().set_value(SETTINGS_VERSION_CACHE_KEY, version)
+	return version
+
+
+def persist_cached_token():
+	"""Write the token shared in the cache to Xero Settings and commit it"""
+	token = frappe.cache().get_value(TOKEN_CACHE_KEY, expires=True)
+	if not token or not token.get("access_token"):
+		return
+
+	frappe.db.set_single_value(
+		"Xero Settings",
+		{
+			"access_token": token["access_token"],
+			"refresh_token": token["refresh_token"],
+			"token_expires_at": token["expires_at"],
+		},
+	)
+	frappe.db.commit()
+
+
+def reset_xero_client(clear_token=False):
+	"""Invalidate the process-level clients of every worker after Xero Settings change"""
+	frappe.cache().delete_value(SETTINGS_VERSION_CACHE_KEY)
+	if clear_token:
+		frappe.cache().delete_value(TOKEN_CACHE_KEY)
 
 
 # Utility function to get Xero client
 @frappe.whitelist()
 def get_xero_client():
-	"""Get configured Xero API client"""
-	return XeroAPIClient()
+	"""Get configured Xero API client, reused across jobs in this worker process"""
+	site = frappe.local.site
+	version = get_settings_version()
+
+	client = _clients.get(site)
+	if not client or client.settings_version != version:
+		client = XeroAPIClient()
+		client.settings_version = version
+		_clients[site] = client
+
+	return client
@@ -1,6 +1,6 @@
 import frappe
 
-from .base import get_xero_client
+from .base import DEFAULT_TIMEOUT, XeroAPIClient, get_http_session, get_xero_client
 
 
 @frappe.whitelist()
@@ -17,8 +17,8 @@ def authorize():
 		if not settings.client_id or not settings.get_password("client_secret"):
 			return {"status": "error", "message": "Client ID or Client Secret is missing in Xero Settings."}
 
-		# Initialize client and exchange code for token
-		client = get_xero_client()
+		# Initialize a fresh client so the newly saved code and credentials are used
+		client = XeroAPIClient()
 		token_data = client.exchange_code_for_token()  # Returns token data or raises exception
 
 		# If we reach here, the token exchange was successful
@@ -92,15 +92,15 @@ def test_connection_simple():
 def test_connection_with_token(access_token, tenant_id):
 	"""Test connection with specific token and tenant"""
 	try:
-		import requests
-
 		headers = {
 			"Authorization": f"Bearer {access_token}",
 			"Xero-Tenant-Id": tenant_id,
 			"Accept": "application/json",
 		}
 
-		response = requests.get("https://api.xero.com/api.xro/2.0/Organisation", headers=headers)
+		response = get_http_session().get(
+			"https://api.xero.com/api.xro/2.0/Organisation", headers=headers, timeout=DEFAULT_TIMEOUT
+		)
 
 		if response.status_code == 200:
 			data = response.json()
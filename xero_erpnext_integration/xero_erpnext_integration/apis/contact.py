@@ -1,23 +1,155 @@
 import json
+from datetime import datetime, timezone
 
 import frappe
+from frappe.utils import cint, create_batch, now
 
-from .base import get_xero_client
+from ..doctype.xero_sync_cursor.xero_sync_cursor import WATERMARK_OVERLAP, get_watermark, set_watermark
+from .base import get_xero_client, if_modified_since, parse_xero_date
+
+# Xero recommends up to 50 contacts per POST
+CONTACT_BATCH_SIZE = 50
+
+# Mirror rows written per bulk statement
+MIRROR_BATCH_SIZE = 500
+
+# Redis hash of customer -> Xero ContactID, "" for customers without one
+CUSTOMER_CONTACT_CACHE_KEY = "xero_customer_contact_ids"
+CUSTOMER_CONTACT_CACHE_TTL = 86400
+
+# Fields of the Xero Contact mirror, in bulk insert order
+MIRROR_FIELDS = [
+	"contact_id",
+	"contact_name",
+	"first_name",
+	"last_name",
+	"contact_status",
+	"email_address",
+	"account_number",
+	"phone",
+	"is_customer",
+	"is_supplier",
+	"updated_date_utc",
+]
 
 
 @frappe.whitelist()
 def get_xero_contacts():
-	"""Get all Xero contacts"""
+	"""Get all Xero contacts from the local mirror"""
+	try:
+		contacts = frappe.get_all("Xero Contact", fields=MIRROR_FIELDS, order_by="contact_name")
+
+		return {"status": "success", "data": [to_xero_contact(contact) for contact in contacts]}
+
+	except Exception as e:
+		return {"status": "error", "message": str(e)}
+
+
+@frappe.whitelist()
+def sync_xero_contacts(full=False):
+	"""
+	Refresh the Xero Contact mirror.
+
+	The first run, or a call with full=1, pages through every contact in Xero. Later
+	runs only fetch contacts modified since the watermark of the last successful run.
+	"""
 	try:
 		client = get_xero_client()
-		response = client.make_request("GET", "/Contacts")
+		started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+		watermark = None if cint(full) else get_watermark("Contacts", client.tenant_id)
+
+		contacts = list(
+			client.get_paged(
+				"Contacts",
+				"Contacts",
+				params={"includeArchived": "true"},
+				headers=if_modified_since(watermark),
+			)
+		)
+
+		for batch in create_batch(contacts, MIRROR_BATCH_SIZE):
+			upsert_xero_contacts(batch)
+			frappe.db.commit()
+
+		set_watermark("Contacts", client.tenant_id, started_at - WATERMARK_OVERLAP)
 
-		return {"status": "success", "data": response.get("Contacts", [])}
+		return {"status": "success", "message": f"Synced {len(contacts)} Xero contacts"}
 
 	except Exception as e:
+		frappe.log_error("Xero Contact Mirror", f"Error syncing Xero contacts: {str(e)}")
 		return {"status": "error", "message": str(e)}
 
 
+def refresh_contacts_from_xero(contact_ids):
+	"""Refresh mirrored contacts in one IDs query, for CONTACT webhook events"""
+	contacts = get_xero_client().get_paged(
+		"Contacts", "Contacts", params={"includeArchived": "true"}, ids=contact_ids
+	)
+	upsert_xero_contacts(list(contacts))
+
+
+def upsert_xero_contacts(contacts):
+	"""Insert or update Xero Contact mirror rows in bulk"""
+	rows = {contact["ContactID"]: to_mirror_row(contact) for contact in contacts if contact.get("ContactID")}
+	if not rows:
+		return
+
+	existing = set(frappe.get_all("Xero Contact", filters={"name": ["in", list(rows)]}, pluck="name"))
+	if existing:
+		frappe.db.bulk_update("Xero Contact", {name: rows[name] for name in existing})
+
+	new_names = [name for name in rows if name not in existing]
+	if new_names:
+		timestamp = now()
+		user = frappe.session.user
+		frappe.db.bulk_insert(
+			"Xero Contact",
+			["name", "creation", "modified", "owner", "modified_by", *MIRROR_FIELDS],
+			[
+				[name, timestamp, timestamp, user, user, *(rows[name][field] for field in MIRROR_FIELDS)]
+				for name in new_names
+			],
+		)
+
+
+def to_mirror_row(contact):
+	"""Map a Xero contact to Xero Contact mirror fields"""
+	phone = next(
+		(phone.get("PhoneNumber") for phone in contact.get("Phones") or [] if phone.get("PhoneNumber")),
+		None,
+	)
+
+	return {
+		"contact_id": contact.get("ContactID"),
+		"contact_name": contact.get("Name"),
+		"first_name": contact.get("FirstName"),
+		"last_name": contact.get("LastName"),
+		"contact_status": contact.get("ContactStatus"),
+		"email_address": contact.get("EmailAddress"),
+		"account_number": contact.get("AccountNumber"),
+		"phone": phone,
+		"is_customer": cint(contact.get("IsCustomer")),
+		"is_supplier": cint(contact.get("IsSupplier")),
+		"updated_date_utc": parse_xero_date(contact.get("UpdatedDateUTC")),
+	}
+
+
+def to_xero_contact(row):
+	"""Map a Xero Contact mirror row back to the shape returned by the Xero API"""
+	return {
+		"ContactID": row.contact_id,
+		"Name": row.contact_name,
+		"FirstName": row.first_name,
+		"LastName": row.last_name,
+		"ContactStatus": row.contact_status,
+		"EmailAddress": row.email_address,
+		"AccountNumber": row.account_number,
+		"IsCustomer": bool(row.is_customer),
+		"IsSupplier": bool(row.is_supplier),
+		"Phones": [{"PhoneType": "DEFAULT", "PhoneNumber": row.phone}] if row.phone else [],
+	}
+
+
 def get_contact(self, contact_name=None):
 	"""Get contacts from Xero"""
 	try:
@@ -40,33 +172,8 @@ def create_contact(doc, method=None):
 		client = get_xero_client()
 		contact = frappe.get_doc("Contact", doc)
 
-		# Check customer and supplier links
-		is_customer = False
-		is_supplier = False
-
-		if hasattr(contact, "links") and contact.links:
-			for link in contact.links:
-				if link.link_doctype == "Customer":
-					is_customer = True
-				if link.link_doctype == "Supplier":
-					is_supplier = True
-
-		contact_data = {
-			"Name": contact.name,
-			"FirstName": contact.first_name or "",
-			"LastName": contact.last_name or "",
-			"EmailAddress": contact.email_id or "",
-			"AccountNumber": contact.custom_account_number or contact.name,
-			"IsCustomer": is_customer,
-			"IsSupplier": is_supplier,
-			"Addresses": [
-				{
-					"AddressType": "STREET",
-					"AddressLine1": contact.address or "",
-				}
-			],
-			"Phones": [{"PhoneType": "DEFAULT", "PhoneNumber": contact.phone or contact.mobile_no or ""}],
-		}
+		link_doctypes = {link.link_doctype for link in contact.links or []}
+		contact_data = build_contact_payload(contact, link_doctypes)
 		data = {"Contacts": [contact_data]}
 		response = client.make_request("POST", "/Contacts", data=data)
 
@@ -77,3 +184,228 @@ def create_contact(doc, method=None):
 	except Exception as e:
 		frappe.log_error(f"Failed to create contact: {str(e)}", "Xero Create Contact")
 		return None
+
+
+def build_contact_payload(contact, link_doctypes):
+	"""Build the Xero contact payload for a Contact doc or a row with the same fields"""
+	contact_data = {
+		"Name": contact.name,
+		"FirstName": contact.first_name or "",
+		"LastName": contact.last_name or "",
+		"EmailAddress": contact.email_id or "",
+		"AccountNumber": contact.custom_account_number or contact.name,
+		"IsCustomer": "Customer" in link_doctypes,
+		"IsSupplier": "Supplier" in link_doctypes,
+		"Addresses": [
+			{
+				"AddressType": "STREET",
+				"AddressLine1": contact.address or "",
+			}
+		],
+		"Phones": [{"PhoneType": "DEFAULT", "PhoneNumber": contact.phone or contact.mobile_no or ""}],
+	}
+
+	# An existing ContactID makes Xero update the contact instead of creating a new one
+	if contact.get("custom_contact_id"):
+		contact_data["ContactID"] = contact.custom_contact_id
+
+	return contact_data
+
+
+@frappe.whitelist()
+def push_contacts_to_xero(filters=None):
+	"""Queue a bulk sync of the Contacts matching the filters to Xero"""
+	filters = frappe.parse_json(filters) if isinstance(filters, str) else filters
+
+	frappe.enqueue(
+		"xero_erpnext_integration.xero_erpnext_integration.apis.contact.push_contacts",
+		queue="long",
+		timeout=7200,
+		filters=filters,
+	)
+
+	return {"status": "success", "message": "Contact sync to Xero has been queued"}
+
+
+def push_contacts(filters=None):
+	"""Create or update Contacts in Xero, up to CONTACT_BATCH_SIZE per request"""
+	contact_names = frappe.get_all("Contact", filters=filters, pluck="name", order_by="name")
+
+	client = get_xero_client()
+	result = {"synced": 0, "failed": {}}
+
+	for batch in create_batch(contact_names, CONTACT_BATCH_SIZE):
+		contacts = frappe.get_all(
+			"Contact",
+			filters={"name": ["in", batch]},
+			fields=[
+				"name",
+				"first_name",
+				"last_name",
+				"email_id",
+				"custom_account_number",
+				"custom_contact_id",
+				"address",
+				"phone",
+				"mobile_no",
+			],
+		)
+
+		# Customer / Supplier links of the whole batch in one query
+		link_doctypes = {}
+		for link in frappe.get_all(
+			"Dynamic Link",
+			filters={
+				"parenttype": "Contact",
+				"parent": ["in", batch],
+				"link_doctype": ["in", ["Customer", "Supplier"]],
+			},
+			fields=["parent", "link_doctype"],
+		):
+			link_doctypes.setdefault(link.parent, set()).add(link.link_doctype)
+
+		payloads = {
+			contact.name: build_contact_payload(contact, link_doctypes.get(contact.name, set()))
+			for contact in contacts
+		}
+
+		contact_ids = push_contact_batch(client, payloads, result)
+
+		# Write back every ContactID of the batch in one statement
+		if contact_ids:
+			frappe.db.bulk_update(
+				"Contact",
+				{
+					name: {"custom_contact_id": contact_id, "custom_send_to_xero": 1}
+					for name, contact_id in contact_ids.items()
+				},
+				update_modified=False,
+			)
+			frappe.db.commit()
+			clear_customer_contact_ids()
+
+		result["synced"] += len(contact_ids)
+
+	if result["failed"]:
+		frappe.log_error(
+			"Xero Bulk Contact Sync",
+			"\n".join(f"{name}: {error}" for name, error in result["failed"].items()),
+		)
+
+	return result
+
+
+def push_contact_batch(client, payloads, result):
+	"""POST one batch of contacts and return the ContactID of every successful one"""
+	names = list(payloads)
+	contact_ids = {}
+
+	try:
+		response = client.make_request(
+			"POST",
+			"/Contacts",
+			data={"Contacts": list(payloads.values())},
+			params={"summarizeErrors": "false"},
+		)
+	except Exception as e:
+		for name in names:
+			result["failed"][name] = str(e)
+		return contact_ids
+
+	# With summarizeErrors=false Xero returns one element per contact, in request order
+	for position, xero_contact in enumerate(response.get("Contacts", [])):
+		name = xero_contact.get("Name")
+		if name not in payloads:
+			name = names[position] if position < len(names) else None
+		if not name:
+			continue
+
+		if xero_contact.get("HasValidationErrors") or xero_contact.get("StatusAttributeString") == "ERROR":
+			errors = [error.get("Message") for error in xero_contact.get("ValidationErrors") or []]
+			result["failed"][name] = "; ".join(errors) or "Unknown error"
+			continue
+
+		contact_ids[name] = xero_contact.get("ContactID")
+
+	return contact_ids
+
+
+def get_customer_contact_id(customer):
+	"""Resolve one customer to its Xero ContactID"""
+	return get_customer_contact_ids([customer]).get(customer)
+
+
+def get_customer_contact_ids(customers):
+	"""
+	Resolve customers to Xero ContactIDs.
+
+	Answers come from a site-wide Redis hash; customers missing from it are resolved
+	with one joined query and written back, including customers that have no ContactID.
+	"""
+	customers = list(dict.fromkeys(customer for customer in customers if customer))
+	if not customers:
+		return {}
+
+	cache = frappe.cache()
+	key = cache.make_key(CUSTOMER_CONTACT_CACHE_KEY)
+
+	resolved = {}
+	missing = []
+	for customer, contact_id in zip(customers, cache.hmget(key, customers), strict=False):
+		if contact_id is None:
+			missing.append(customer)
+		else:
+			resolved[customer] = contact_id.decode() or None
+
+	if missing:
+		found = load_customer_contact_ids(missing)
+		pipeline = cache.pipeline()
+		pipeline.hset(key, mapping={customer: found.get(customer) or "" for customer in missing})
+		pipeline.expire(key, CUSTOMER_CONTACT_CACHE_TTL)
+		pipeline.execute()
+
+		resolved.update({customer: found.get(customer) for customer in missing})
+
+	return resolved
+
+
+def load_customer_contact_ids(customers):
+	"""Query the ContactID of each customer's linked Contact, preferring the primary contact"""
+	contact_ids = {}
+
+	for batch in create_batch(customers, 1000):
+		rows = frappe.db.sql(
+			"""
+			select link.link_name, contact.custom_contact_id
+			from `tabDynamic Link` link
+			inner join `tabContact` contact on contact.name = link.parent
+			where link.parenttype = 'Contact'
+				and link.link_doctype = 'Customer'
+				and link.link_name in %(customers)s
+				and ifnull(contact.custom_contact_id, '') != ''
+			order by contact.is_primary_contact, contact.modified
+			""",
+			{"customers": batch},
+		)
+		# Later rows win, so the primary and most recently modified contact is kept
+		contact_ids.update(rows)
+
+	return contact_ids
+
+
+def clear_customer_contact_ids(customers=None):
+	"""Drop cached ContactIDs of the given customers, or of every customer"""
+	if customers is None:
+		frappe.cache().delete_value(CUSTOMER_CONTACT_CACHE_KEY)
+		return
+
+	for customer in customers:
+		frappe.cache().hdel(CUSTOMER_CONTACT_CACHE_KEY, customer)
+
+
+def invalidate_customer_contact_ids(doc, method=None):
+	"""Contact doc event: forget the customers the Contact links to, before and after the change"""
+	previous = doc.get_doc_before_save()
+	links = list(doc.get("links") or []) + list(previous.get("links") or [] if previous else [])
+
+	clear_customer_contact_ids({link.link_name for link in links if link.link_doctype == "Customer"})
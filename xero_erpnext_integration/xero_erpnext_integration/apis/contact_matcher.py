@@ -0,0 +1,171 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+import frappe
+
+from .contact import MIRROR_FIELDS
+
+DEFAULT_LIMIT = 10
+MIN_SCORE = 0.2
+
+# Weight of each field in the combined score; only fields given in the query count
+NAME_WEIGHT = 1.0
+EMAIL_WEIGHT = 1.0
+ACCOUNT_NUMBER_WEIGHT = 1.0
+
+# Trigrams shared by more contacts than this are too common to nominate candidates
+MAX_POSTING_SIZE = 5000
+
+# Legal suffixes that carry no signal when comparing organisation names
+NAME_STOPWORDS = {"co", "company", "corp", "inc", "llc", "llp", "ltd", "limited", "plc", "pty", "the"}
+
+# Per-site indexes, rebuilt when the Xero Contact mirror changes
+_indexes = {}
+_lock = threading.Lock()
+
+
+def normalize_tokens(value):
+	"""Split a name into lowercase ASCII word tokens without punctuation or legal suffixes"""
+	value = unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode()
+	tokens = re.sub(r"[^a-z0-9]+", " ", value.lower()).split()
+	return [token for token in tokens if token not in NAME_STOPWORDS] or tokens
+
+
+def normalize_value(value):
+	"""Normalize an email address or account number for exact comparison"""
+	return (value or "").strip().lower()
+
+
+def trigrams(tokens):
+	"""Character trigrams of each padded token, so word order does not matter"""
+	grams = set()
+	for token in tokens:
+		padded = f" {token} "
+		grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+	return grams
+
+
+def dice(shared, left, right):
+	return 2 * shared / (left + right) if left + right else 0.0
+
+
+class ContactIndex:
+	"""
+	Inverted index over Xero contacts for ranked fuzzy lookups.
+
+	Names are indexed by normalized token and by character trigram, emails and account
+	numbers by exact value. A search only scores the contacts that share at least one
+	key with the query, so the cost follows the number of candidates rather than the
+	size of the contact list.
+	"""
+
+	def __init__(self, contacts=None):
+		self.contacts = {}
+		self.tokens = {}
+		self.gram_counts = {}
+		self.token_index = defaultdict(set)
+		self.gram_index = defaultdict(set)
+		self.email_index = defaultdict(set)
+		self.account_index = defaultdict(set)
+
+		for contact in contacts or []:
+			self.add(contact)
+
+	def __len__(self):
+		return len(self.contacts)
+
+	def add(self, contact):
+		"""Index a Xero Contact mirror row"""
+		contact_id = contact.contact_id
+		tokens = normalize_tokens(contact.contact_name)
+		grams = trigrams(tokens)
+
+		self.contacts[contact_id] = contact
+		self.tokens[contact_id] = set(tokens)
+		self.gram_counts[contact_id] = len(grams)
+
+		for token in tokens:
+			self.token_index[token].add(contact_id)
+		for gram in grams:
+			self.gram_index[gram].add(contact_id)
+		if contact.email_address:
+			self.email_index[normalize_value(contact.email_address)].add(contact_id)
+		if contact.account_number:
+			self.account_index[normalize_value(contact.account_number)].add(contact_id)
+
+	def search(self, name=None, email=None, account_number=None, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+		"""Return up to limit (contact, score) pairs, best first"""
+		tokens = set(normalize_tokens(name))
+		grams = trigrams(tokens)
+		email = normalize_value(email)
+		account_number = normalize_value(account_number)
+
+		# Count the trigrams each candidate shares with the query
+		shared_grams = defaultdict(int)
+		postings = [self.gram_index[gram] for gram in grams if gram in self.gram_index]
+		selective = [posting for posting in postings if len(posting) <= MAX_POSTING_SIZE]
+		for posting in selective or postings:
+			for contact_id in posting:
+				shared_grams[contact_id] += 1
+
+		candidates = set(shared_grams)
+		for token in tokens:
+			candidates.update(self.token_index.get(token, ()))
+		email_matches = self.email_index.get(email, set()) if email else set()
+		account_matches = self.account_index.get(account_number, set()) if account_number else set()
+		candidates.update(email_matches, account_matches)
+
+		total_weight = (
+			(NAME_WEIGHT if tokens else 0)
+			+ (EMAIL_WEIGHT if email else 0)
+			+ (ACCOUNT_NUMBER_WEIGHT if account_number else 0)
+		)
+		if not total_weight:
+			return []
+
+		results = []
+		for contact_id in candidates:
+			score = 0.0
+			if tokens:
+				contact_tokens = self.tokens[contact_id]
+				token_score = dice(len(tokens & contact_tokens), len(tokens), len(contact_tokens))
+				gram_score = dice(shared_grams.get(contact_id, 0), len(grams), self.gram_counts[contact_id])
+				score += NAME_WEIGHT * (0.4 * token_score + 0.6 * gram_score)
+			if contact_id in email_matches:
+				score += EMAIL_WEIGHT
+			if contact_id in account_matches:
+				score += ACCOUNT_NUMBER_WEIGHT
+
+			score /= total_weight
+			if score >= min_score:
+				results.append((self.contacts[contact_id], round(score, 4)))
+
+		results.sort(key=lambda result: (-result[1], result[0].contact_name or ""))
+		return results[:limit]
+
+
+def get_contact_index():
+	"""Return the index over the Xero Contact mirror, rebuilt only when the mirror has changed"""
+	count, last_modified = frappe.db.sql("select count(*), max(modified) from `tabXero Contact`")[0]
+	version = (count, str(last_modified))
+
+	with _lock:
+		cached = _indexes.get(frappe.local.site)
+		if cached and cached[0] == version:
+			return cached[1]
+
+	index = ContactIndex(frappe.get_all("Xero Contact", fields=MIRROR_FIELDS))
+
+	with _lock:
+		_indexes[frappe.local.site] = (version, index)
+
+	return index
+
+
+def match_contacts(name=None, email=None, account_number=None, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+	"""Rank mirrored Xero contacts against a name, email and account number"""
+	return get_contact_index().search(
+		name=name, email=email, account_number=account_number, limit=limit, min_score=min_score
+	)
@@ -0,0 +1,192 @@
+import re
+from collections import defaultdict
+
+import frappe
+from frappe.utils import create_batch, now
+
+from .contact import MIRROR_FIELDS, clear_customer_contact_ids
+from .contact_matcher import normalize_tokens, normalize_value
+
+# Evidence each blocking key contributes to a candidate pair
+KEY_WEIGHTS = {"email": 0.5, "account_number": 0.5, "name": 0.4, "phone": 0.3}
+
+# Unambiguous pairs at or above this score are linked without review
+AUTO_LINK_SCORE = 0.5
+
+# Candidates queued for review per Contact
+MAX_REVIEW_CANDIDATES = 5
+
+# Blocks larger than this (shared switchboard numbers, generic names) are not informative
+MAX_BLOCK_SIZE = 20
+
+RECONCILE_BATCH_SIZE = 1000
+
+# Digits kept from a phone number, enough to ignore country and trunk prefixes
+PHONE_DIGITS = 9
+
+
+@frappe.whitelist()
+def reconcile_contacts_with_xero():
+	"""Queue a reconciliation of unmapped Contacts against the Xero Contact mirror"""
+	frappe.enqueue(
+		"xero_erpnext_integration.xero_erpnext_integration.apis.contact_reconciliation.reconcile_contacts",
+		queue="long",
+		timeout=3600,
+		job_id="xero_contact_reconciliation",
+		deduplicate=True,
+	)
+
+	return {"status": "success", "message": "Contact reconciliation with Xero has been queued"}
+
+
+def reconcile_contacts():
+	"""
+	Link unmapped Contacts to mirrored Xero contacts.
+
+	Both sides are loaded once and grouped by blocking keys (email, account number,
+	phone digits and sorted name tokens), so only records sharing a key are compared.
+	A pair that is the only candidate on both sides and scores at least AUTO_LINK_SCORE
+	is linked in bulk; every other candidate goes to the Xero Contact Match review queue.
+	"""
+	try:
+		contacts = frappe.get_all(
+			"Contact",
+			filters={"custom_contact_id": ["is", "not set"]},
+			fields=["name", "email_id", "phone", "mobile_no", "custom_account_number"],
+		)
+		mapped_ids = set(
+			frappe.get_all("Contact", filters={"custom_contact_id": ["is", "set"]}, pluck="custom_contact_id")
+		)
+		xero_contacts = [
+			contact
+			for contact in frappe.get_all("Xero Contact", fields=MIRROR_FIELDS)
+			if contact.contact_id not in mapped_ids and contact.contact_status != "ARCHIVED"
+		]
+
+		blocks = defaultdict(list)
+		for xero_contact in xero_contacts:
+			for key in xero_blocking_keys(xero_contact):
+				blocks[key].append(xero_contact.contact_id)
+
+		candidates = {}
+		claims = defaultdict(int)
+		for contact in contacts:
+			scored = score_candidates(contact_blocking_keys(contact), blocks)
+			if scored:
+				candidates[contact.name] = scored
+				for contact_id, _score, _matched_on in scored:
+					claims[contact_id] += 1
+
+		links = {}
+		review = []
+		for contact_name, scored in candidates.items():
+			contact_id, score, _matched_on = scored[0]
+			if len(scored) == 1 and claims[contact_id] == 1 and score >= AUTO_LINK_SCORE:
+				links[contact_name] = {"custom_contact_id": contact_id}
+			else:
+				review.extend((contact_name, *candidate) for candidate in scored[:MAX_REVIEW_CANDIDATES])
+
+		if links:
+			frappe.db.bulk_update("Contact", links)
+			clear_customer_contact_ids()
+		queue_for_review(
+			list(candidates), review, {contact.contact_id: contact.contact_name for contact in xero_contacts}
+		)
+		frappe.db.commit()
+
+		return {
+			"status": "success",
+			"message": f"Linked {len(links)} contacts, {len(candidates) - len(links)} queued for review",
+		}
+
+	except Exception as e:
+		frappe.log_error("Xero Contact Reconciliation", f"Error reconciling contacts: {str(e)}")
+		return {"status": "error", "message": str(e)}
+
+
+def phone_key(value):
+	digits = re.sub(r"\D", "", value or "")
+	return digits[-PHONE_DIGITS:] if len(digits) >= 7 else None
+
+
+def name_key(value):
+	tokens = normalize_tokens(value)
+	return " ".join(sorted(tokens)) if tokens else None
+
+
+def blocking_keys(name, email, account_number, phones):
+	keys = {
+		("name", name_key(name)),
+		("email", normalize_value(email)),
+		("account_number", normalize_value(account_number)),
+	}
+	keys.update(("phone", phone_key(phone)) for phone in phones)
+	return {key for key in keys if key[1]}
+
+
+def contact_blocking_keys(contact):
+	# Contacts pushed from ERPNext use the Contact name and account number in Xero
+	return blocking_keys(
+		contact.name,
+		contact.email_id,
+		contact.custom_account_number or contact.name,
+		[contact.phone, contact.mobile_no],
+	)
+
+
+def xero_blocking_keys(xero_contact):
+	return blocking_keys(
+		xero_contact.contact_name,
+		xero_contact.email_address,
+		xero_contact.account_number,
+		[xero_contact.phone],
+	)
+
+
+def score_candidates(keys, blocks):
+	"""Score the Xero contacts sharing a blocking key with a Contact, best first"""
+	matched = defaultdict(set)
+	for key in keys:
+		block = blocks.get(key, ())
+		if len(block) > MAX_BLOCK_SIZE:
+			continue
+		for contact_id in block:
+			matched[contact_id].add(key[0])
+
+	scored = [
+		(contact_id, min(1.0, sum(KEY_WEIGHTS[kind] for kind in kinds)), ", ".join(sorted(kinds)))
+		for contact_id, kinds in matched.items()
+	]
+	scored.sort(key=lambda candidate: -candidate[1])
+	return scored
+
+
+def queue_for_review(contact_names, review, xero_names):
+	"""Replace the open review candidates of the Contacts in this run"""
+	for batch in create_batch(contact_names, RECONCILE_BATCH_SIZE):
+		frappe.db.delete("Xero Contact Match", {"status": "Open", "contact": ["in", batch]})
+
+	fields = ["contact", "xero_contact", "xero_contact_name", "status", "score", "matched_on"]
+	timestamp = now()
+	user = frappe.session.user
+	for batch in create_batch(review, RECONCILE_BATCH_SIZE):
+		frappe.db.bulk_insert(
+			"Xero Contact Match",
+			["name", "creation", "modified", "owner", "modified_by", *fields],
+			[
+				[
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					user,
+					user,
+					contact_name,
+					contact_id,
+					xero_names.get(contact_id),
+					"Open",
+					score,
+					matched_on,
+				]
+				for contact_name, contact_id, score, matched_on in batch
+			],
+		)
@@ -33,6 +33,7 @@ def create_payment_from_xero(xero_invoice_id, payment_amount):
 				"target_exchange_rate": 1,
 				"reference_no": f"Xero-{xero_invoice_id}",
 				"reference_date": frappe.utils.today(),
+				"custom_from_xero": 1,
 				"paid_to": get_default_receivable_account(),
 				"paid_from": get_default_cash_account(),
 				"references": [
@@ -0,0 +1,181 @@
+from collections import defaultdict
+
+import frappe
+from frappe.utils import cint, flt
+from werkzeug.wrappers import Response
+
+from .api_log import get_endpoint
+
+# Redis hash of every counter, histogram bucket and rate-limit gauge, by "kind|labels" field
+METRICS_CACHE_KEY = "xero_api_metrics"
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Rate-limit response headers kept as gauges, by the window they report on
+RATE_LIMIT_HEADERS = {
+	"minute": "X-MinLimit-Remaining",
+	"day": "X-DayLimit-Remaining",
+	"app_minute": "X-AppMinLimit-Remaining",
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def record_api_call(tenant_id, method, url, response, seconds, retry=False):
+	"""
+	Count one HTTP exchange with Xero and add its latency to the histogram.
+
+	Called for every attempt, so retried calls and 429s show up per attempt. All
+	updates go to one Redis hash in a single round trip.
+	"""
+	cache = frappe.cache()
+	key = cache.make_key(METRICS_CACHE_KEY)
+	labels = f"{method}|{get_endpoint(url)}"
+	status = str(response.status_code) if response is not None else "error"
+	bucket = next((str(bound) for bound in LATENCY_BUCKETS if seconds <= bound), "+Inf")
+
+	pipeline = cache.pipeline()
+	pipeline.hincrby(key, f"requests|{labels}|{status}", 1)
+	pipeline.hincrby(key, f"latency_bucket|{labels}|{bucket}", 1)
+	pipeline.hincrbyfloat(key, f"latency_sum|{labels}", seconds)
+	if retry:
+		pipeline.hincrby(key, f"retries|{labels}", 1)
+
+	if response is not None:
+		for window, header in RATE_LIMIT_HEADERS.items():
+			if response.headers.get(header) is not None:
+				pipeline.hset(
+					key, f"remaining|{tenant_id or 'default'}|{window}", cint(response.headers[header])
+				)
+
+	pipeline.execute()
+
+
+def load_metrics():
+	"""Parse the metrics hash into counters keyed by their label tuples"""
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	pipeline.hgetall(cache.make_key(METRICS_CACHE_KEY))
+	(values,) = pipeline.execute()
+
+	metrics = defaultdict(dict)
+	for field, value in values.items():
+		kind, *labels = frappe.safe_decode(field).split("|")
+		metrics[kind][tuple(labels)] = flt(frappe.safe_decode(value))
+
+	return metrics
+
+
+@frappe.whitelist()
+def get_prometheus_metrics():
+	"""Xero API metrics in the Prometheus text exposition format"""
+	frappe.only_for("System Manager")
+
+	metrics = load_metrics()
+	lines = [
+		"# HELP xero_api_requests_total Xero API responses by method, endpoint and status.",
+		"# TYPE xero_api_requests_total counter",
+	]
+	for (method, endpoint, status), value in sorted(metrics["requests"].items()):
+		lines.append(
+			f"xero_api_requests_total{format_labels(method=method, endpoint=endpoint, status=status)} {int(value)}"
+		)
+
+	lines += [
+		"# HELP xero_api_retries_total Xero API attempts that retried a rate-limited call.",
+		"# TYPE xero_api_retries_total counter",
+	]
+	for (method, endpoint), value in sorted(metrics["retries"].items()):
+		lines.append(f"xero_api_retries_total{format_labels(method=method, endpoint=endpoint)} {int(value)}")
+
+	lines += [
+		"# HELP xero_api_request_duration_seconds Latency of Xero API attempts.",
+		"# TYPE xero_api_request_duration_seconds histogram",
+	]
+	buckets = defaultdict(dict)
+	for (method, endpoint, bound), value in metrics["latency_bucket"].items():
+		buckets[(method, endpoint)][bound] = value
+	for (method, endpoint), counts in sorted(buckets.items()):
+		cumulative = 0
+		for bound in [*(str(bound) for bound in LATENCY_BUCKETS), "+Inf"]:
+			cumulative += counts.get(bound, 0)
+			lines.append(
+				f"xero_api_request_duration_seconds_bucket{format_labels(method=method, endpoint=endpoint, le=bound)} {int(cumulative)}"
+			)
+		labels = format_labels(method=method, endpoint=endpoint)
+		lines.append(
+			f"xero_api_request_duration_seconds_sum{labels} {metrics['latency_sum'].get((method, endpoint), 0)}"
+		)
+		lines.append(f"xero_api_request_duration_seconds_count{labels} {int(cumulative)}")
+
+	lines += [
+		"# HELP xero_api_rate_limit_remaining Calls left in each Xero rate-limit window, as last reported.",
+		"# TYPE xero_api_rate_limit_remaining gauge",
+	]
+	for (tenant_id, window), value in sorted(metrics["remaining"].items()):
+		lines.append(
+			f"xero_api_rate_limit_remaining{format_labels(tenant_id=tenant_id, window=window)} {int(value)}"
+		)
+
+	return Response("\n".join(lines) + "\n", content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def format_labels(**labels):
+	return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def escape_label(value):
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@frappe.whitelist()
+def get_metrics_summary():
+	"""Totals per endpoint and the remaining rate budget, for the Xero Settings card"""
+	frappe.only_for("System Manager")
+
+	metrics = load_metrics()
+	endpoints = defaultdict(
+		lambda: {"requests": 0, "errors": 0, "rate_limited": 0, "retries": 0, "seconds": 0}
+	)
+	for (method, endpoint, status), value in metrics["requests"].items():
+		totals = endpoints[f"{method} {endpoint}"]
+		totals["requests"] += int(value)
+		if status == "error" or cint(status) >= 400:
+			totals["errors"] += int(value)
+		if status == "429":
+			totals["rate_limited"] += int(value)
+	for (method, endpoint), value in metrics["retries"].items():
+		endpoints[f"{method} {endpoint}"]["retries"] += int(value)
+	for (method, endpoint), value in metrics["latency_sum"].items():
+		endpoints[f"{method} {endpoint}"]["seconds"] += value
+
+	return {
+		"endpoints": sorted(
+			(
+				{
+					"endpoint": endpoint,
+					"requests": totals["requests"],
+					"error_rate": flt(totals["errors"] * 100 / totals["requests"], 1)
+					if totals["requests"]
+					else 0,
+					"rate_limited": totals["rate_limited"],
+					"retries": totals["retries"],
+					"avg_ms": int(totals["seconds"] * 1000 / totals["requests"]) if totals["requests"] else 0,
+				}
+				for endpoint, totals in endpoints.items()
+			),
+			key=lambda row: -row["requests"],
+		),
+		"remaining": {
+			f"{tenant_id} {window}": int(value) for (tenant_id, window), value in metrics["remaining"].items()
+		},
+	}
+
+
+@frappe.whitelist()
+def reset_metrics():
+	"""Clear every collected Xero API metric"""
+	frappe.only_for("System Manager")
+	frappe.cache().delete_value(METRICS_CACHE_KEY)
+	return {"status": "success"}
@@ -0,0 +1,113 @@
+import json
+
+import frappe
+
+# Redis hash of [company, customer] -> [paid_from, paid_to] for Payment Entries received from Xero
+PAYMENT_ACCOUNTS_CACHE_KEY = "xero_payment_accounts"
+PAYMENT_ACCOUNTS_CACHE_TTL = 86400
+
+
+def get_payment_accounts(company, customer):
+	"""Resolve the paid_from and paid_to accounts of one customer's Payment Entries"""
+	return resolve_payment_accounts([(company, customer)])[(company, customer)]
+
+
+def resolve_payment_accounts(pairs):
+	"""
+	Resolve paid_from and paid_to accounts for (company, customer) pairs.
+
+	paid_from is the customer's receivable account for the company, else the company
+	default, else its first Receivable ledger. paid_to is the company's default cash
+	or bank account, else its first Cash or Bank ledger. Answers are memoized in a
+	site-wide Redis hash and the pairs missing from it are resolved in one pass.
+	"""
+	pairs = list(dict.fromkeys(pairs))
+	if not pairs:
+		return {}
+
+	cache = frappe.cache()
+	key = cache.make_key(PAYMENT_ACCOUNTS_CACHE_KEY)
+	fields = [json.dumps(pair) for pair in pairs]
+
+	resolved = {}
+	missing = []
+	for pair, value in zip(pairs, cache.hmget(key, fields), strict=False):
+		if value is None:
+			missing.append(pair)
+		else:
+			paid_from, paid_to = json.loads(value)
+			resolved[pair] = frappe._dict(paid_from=paid_from, paid_to=paid_to)
+
+	if missing:
+		loaded = load_payment_accounts(missing)
+		pipeline = cache.pipeline()
+		pipeline.hset(
+			key,
+			mapping={
+				json.dumps(pair): json.dumps([accounts.paid_from, accounts.paid_to])
+				for pair, accounts in loaded.items()
+			},
+		)
+		pipeline.expire(key, PAYMENT_ACCOUNTS_CACHE_TTL)
+		pipeline.execute()
+
+		resolved.update(loaded)
+
+	return resolved
+
+
+def load_payment_accounts(pairs):
+	"""Query the accounts of the given (company, customer) pairs in bulk"""
+	companies = list({company for company, customer in pairs})
+	customers = list({customer for company, customer in pairs})
+
+	receivable_accounts = {}
+	for row in frappe.get_all(
+		"Party Account",
+		filters={"parenttype": "Customer", "parent": ["in", customers], "company": ["in", companies]},
+		fields=["parent", "company", "account"],
+	):
+		receivable_accounts[(row.company, row.parent)] = row.account
+
+	company_defaults = {
+		row.name: row
+		for row in frappe.get_all(
+			"Company",
+			filters={"name": ["in", companies]},
+			fields=["name", "default_receivable_account", "default_cash_account", "default_bank_account"],
+		)
+	}
+
+	# First ledger of each type per company, for companies without defaults
+	fallback_accounts = {}
+	for row in frappe.get_all(
+		"Account",
+		filters={
+			"company": ["in", companies],
+			"account_type": ["in", ["Cash", "Bank", "Receivable"]],
+			"is_group": 0,
+		},
+		fields=["name", "company", "account_type"],
+		order_by="lft",
+	):
+		account_type = "Receivable" if row.account_type == "Receivable" else "Cash"
+		fallback_accounts.setdefault((row.company, account_type), row.name)
+
+	accounts = {}
+	for company, customer in pairs:
+		defaults = company_defaults.get(company) or frappe._dict()
+		accounts[(company, customer)] = frappe._dict(
+			paid_from=receivable_accounts.get((company, customer))
+			or defaults.default_receivable_account
+			or fallback_accounts.get((company, "Receivable")),
+			paid_to=defaults.default_cash_account
+			or defaults.default_bank_account
+			or fallback_accounts.get((company, "Cash")),
+		)
+
+	return accounts
+
+
+def clear_payment_accounts(doc=None, method=None):
+	"""Drop every memoized account pair; the Company, Customer and Account doc event"""
+	frappe.cache().delete_value(PAYMENT_ACCOUNTS_CACHE_KEY)
@@ -1,8 +1,14 @@
 import json
 
 import frappe
+from frappe.utils import create_batch, flt, getdate
 
 from .base import get_xero_client
+from .contact import get_customer_contact_id as resolve_customer_contact_id
+from .reference_data import get_payment_account_code
+
+# Xero accepts up to 50 payments per POST
+PAYMENT_BATCH_SIZE = 50
 
 
 @frappe.whitelist()
@@ -21,17 +27,16 @@ def create_payment(doc, method=None):
 		if payment.payment_type != "Receive":
 			frappe.throw("Only 'Receive' payment entries can be synced to Xero")
 
-		# Get the related invoice's Xero ID
-		invoice_xero_id = None
-		if payment.references:
-			for ref in payment.references:
-				if ref.reference_doctype == "Sales Invoice":
-					# Get Xero Invoice ID from the Sales Invoice
-					sales_invoice = frappe.get_doc("Sales Invoice", ref.reference_name)
-					invoice_xero_id = sales_invoice.get("custom_xero_invoice_number")
-					break
-
-		if not invoice_xero_id:
+		# Payments recorded from Xero, or pushed before, are already there
+		if payment.get("custom_from_xero") or payment.get("custom_xero_payment_id"):
+			return {"status": "info", "message": "Payment already exists in Xero"}
+
+		# Get the Xero IDs of every referenced Sales Invoice
+		references = [ref for ref in payment.references or [] if ref.reference_doctype == "Sales Invoice"]
+		xero_invoice_ids = get_xero_invoice_ids([ref.reference_name for ref in references])
+		references = [ref for ref in references if xero_invoice_ids.get(ref.reference_name)]
+
+		if not references:
 			frappe.throw("No Xero Invoice ID found in the referenced Sales Invoice")
 
 		# Get account code from the payment account
@@ -39,27 +44,57 @@ def create_payment(doc, method=None):
 		if not account_code:
 			frappe.throw(f"No account code found for account: {payment.paid_to}")
 
-		# Prepare payment data
-		payment_data = {
-			"Invoice": {"InvoiceID": invoice_xero_id},
-			"Account": {"Code": account_code},
-			"Date": payment.posting_date.strftime("%Y-%m-%d") if payment.posting_date else None,
-			"Amount": float(payment.paid_amount),
-		}
+		payments = [
+			build_payment_payload(
+				xero_invoice_ids[ref.reference_name],
+				account_code,
+				payment.posting_date,
+				ref.allocated_amount,
+				payment.reference_no,
+			)
+			for ref in references
+		]
+
+		# A receipt settling several invoices is one bank deposit in Xero
+		if len(payments) > 1:
+			data = {"BatchPayments": [build_batch_payment_payload(payment, account_code, payments)]}
+			response = client.make_request("PUT", "/BatchPayments", data=data)
+
+			if response and response.get("BatchPayments"):
+				batch_payment = response["BatchPayments"][0]
+				save_xero_payment_ids(
+					{payment.name: {"custom_xero_payment_id": batch_payment.get("BatchPaymentID")}},
+					{
+						ref.name: {"custom_xero_payment_id": xero_payment.get("PaymentID")}
+						for ref, xero_payment in zip(
+							references, batch_payment.get("Payments") or [], strict=False
+						)
+						if xero_payment.get("PaymentID")
+					},
+				)
+				return {
+					"status": "success",
+					"data": batch_payment,
+					"payment_id": batch_payment.get("BatchPaymentID"),
+					"message": f"Batch payment created in Xero with ID: {batch_payment.get('BatchPaymentID')}",
+				}
 
-		# Add reference if available
-		if payment.reference_no:
-			payment_data["Reference"] = payment.reference_no
+			return {"status": "error", "message": "Failed to create batch payment in Xero"}
 
-		data = {"Payments": [payment_data]}
+		data = {"Payments": payments}
 		response = client.make_request("POST", "/Payments", data=data)
 
 		if response and "Payments" in response:
 			xero_payment = response["Payments"][0]
+			save_xero_payment_ids(
+				{payment.name: {"custom_xero_payment_id": xero_payment.get("PaymentID")}},
+				{references[0].name: {"custom_xero_payment_id": xero_payment.get("PaymentID")}},
+			)
 
 			return {
 				"status": "success",
 				"data": xero_payment,
+				"payment_id": xero_payment.get("PaymentID"),
 				"message": f"Payment created in Xero with ID: {xero_payment.get('PaymentID')}",
 			}
 
@@ -71,17 +106,247 @@ def create_payment(doc, method=None):
 		return False
 
 
+def build_payment_payload(xero_invoice_id, account_code, posting_date, amount, reference_no=None):
+	"""Build the Xero payment payload for one Sales Invoice reference"""
+	payment_data = {
+		"Invoice": {"InvoiceID": xero_invoice_id},
+		"Account": {"Code": account_code},
+		"Date": getdate(posting_date).strftime("%Y-%m-%d") if posting_date else None,
+		"Amount": flt(amount),
+	}
+
+	# Add reference if available
+	if reference_no:
+		payment_data["Reference"] = reference_no
+
+	return payment_data
+
+
+def build_batch_payment_payload(payment, account_code, payments):
+	"""Build a Xero batch payment, one deposit covering every invoice of the Payment Entry"""
+	return {
+		"Account": {"Code": account_code},
+		"Date": getdate(payment.posting_date).strftime("%Y-%m-%d") if payment.posting_date else None,
+		"Reference": payment.reference_no or payment.name,
+		"Payments": [{"Invoice": row["Invoice"], "Amount": row["Amount"]} for row in payments],
+	}
+
+
+def get_xero_invoice_ids(sales_invoices):
+	"""Map Sales Invoice names to their Xero InvoiceID in one query"""
+	if not sales_invoices:
+		return {}
+
+	return dict(
+		frappe.get_all(
+			"Sales Invoice",
+			filters={"name": ["in", list(set(sales_invoices))], "custom_xero_invoice_number": ["is", "set"]},
+			fields=["name", "custom_xero_invoice_number"],
+			as_list=True,
+		)
+	)
+
+
 @frappe.whitelist()
-def get_account_code(account_name):
-	"""Get account code for the given account"""
+def push_payments_to_xero(payment_entry_names=None, from_date=None):
+	"""Queue a bulk push of pending Payment Entries to Xero, by name or posted since from_date"""
+	payment_entry_names = (
+		frappe.parse_json(payment_entry_names)
+		if isinstance(payment_entry_names, str)
+		else payment_entry_names
+	)
+	validate_push_scope(payment_entry_names, from_date)
+
+	frappe.enqueue(
+		"xero_erpnext_integration.xero_erpnext_integration.apis.payment_entry.push_payments",
+		queue="long",
+		timeout=3600,
+		payment_entry_names=payment_entry_names,
+		from_date=from_date,
+	)
+
+	return {"status": "success", "message": "Payment sync to Xero has been queued"}
+
+
+def validate_push_scope(payment_entry_names, from_date):
+	"""
+	Require names or a posting-date cutoff: older Payment Entries may already be in Xero
+	without a saved Xero payment ID, and pushing them again would duplicate the payment.
+	"""
+	if not payment_entry_names and not from_date:
+		frappe.throw("Select the Payment Entries to push, or a posting date to push from")
+
+
+def push_payments(payment_entry_names=None, from_date=None):
+	"""
+	Push submitted Receive Payment Entries that are not in Xero yet.
+
+	Only the named Payment Entries, or the ones posted on or after from_date, are pushed.
+	Payment Entries recorded from Xero payments are skipped, they already exist there.
+
+	Payment Entries settling a single invoice are sent together as /Payments arrays of up
+	to PAYMENT_BATCH_SIZE. Payment Entries settling several invoices become one
+	BatchPayment each, so Xero shows a single bank deposit for them.
+	"""
+	filters = {
+		"docstatus": 1,
+		"payment_type": "Receive",
+		"custom_xero_payment_id": ["is", "not set"],
+		"custom_from_xero": 0,
+	}
+	validate_push_scope(payment_entry_names, from_date)
+	if payment_entry_names:
+		filters["name"] = ["in", payment_entry_names]
+	if from_date:
+		filters["posting_date"] = [">=", getdate(from_date)]
+
+	entries = {
+		entry.name: entry
+		for entry in frappe.get_all(
+			"Payment Entry",
+			filters=filters,
+			fields=["name", "posting_date", "paid_to", "paid_amount", "reference_no"],
+		)
+	}
+
+	client = get_xero_client()
+	result = {"synced": [], "failed": {}}
+	account_codes = {}
+
+	for batch in create_batch(list(entries), PAYMENT_BATCH_SIZE * 10):
+		references = frappe.get_all(
+			"Payment Entry Reference",
+			filters={
+				"parenttype": "Payment Entry",
+				"parent": ["in", batch],
+				"reference_doctype": "Sales Invoice",
+			},
+			fields=["name", "parent", "reference_name", "allocated_amount"],
+			order_by="idx",
+		)
+		xero_invoice_ids = get_xero_invoice_ids([ref.reference_name for ref in references])
+
+		references_by_entry = {}
+		for ref in references:
+			if xero_invoice_ids.get(ref.reference_name):
+				references_by_entry.setdefault(ref.parent, []).append(ref)
+
+		single_payments = []
+		for name in batch:
+			entry = entries[name]
+			entry_references = references_by_entry.get(name)
+			if not entry_references:
+				result["failed"][name] = "No Xero Invoice ID found in the referenced Sales Invoices"
+				continue
+
+			if entry.paid_to not in account_codes:
+				account_codes[entry.paid_to] = get_account_code(entry.paid_to)
+			account_code = account_codes[entry.paid_to]
+
+			payments = [
+				build_payment_payload(
+					xero_invoice_ids[ref.reference_name],
+					account_code,
+					entry.posting_date,
+					ref.allocated_amount,
+					entry.reference_no,
+				)
+				for ref in entry_references
+			]
+
+			if len(payments) == 1:
+				single_payments.append((entry, entry_references[0], payments[0]))
+			else:
+				push_batch_payment(client, entry, entry_references, account_code, payments, result)
+
+		for chunk in create_batch(single_payments, PAYMENT_BATCH_SIZE):
+			push_payment_array(client, chunk, result)
+
+	if result["failed"]:
+		frappe.log_error(
+			"Xero Bulk Payment Sync",
+			"\n".join(f"{name}: {error}" for name, error in result["failed"].items()),
+		)
+
+	return result
+
+
+def push_payment_array(client, rows, result):
+	"""POST a /Payments array and map every returned element back to its reference"""
 	try:
-		account = frappe.get_doc("Account", account_name)
+		response = client.make_request(
+			"POST",
+			"/Payments",
+			data={"Payments": [payload for _entry, _ref, payload in rows]},
+			params={"summarizeErrors": "false"},
+		)
+	except Exception as e:
+		for entry, _ref, _payload in rows:
+			result["failed"][entry.name] = str(e)
+		return
+
+	entry_updates = {}
+	reference_updates = {}
+
+	# With summarizeErrors=false Xero returns one element per payment, in request order
+	for (entry, ref, _payload), xero_payment in zip(rows, response.get("Payments", []), strict=False):
+		if xero_payment.get("HasValidationErrors") or xero_payment.get("StatusAttributeString") == "ERROR":
+			errors = [error.get("Message") for error in xero_payment.get("ValidationErrors") or []]
+			result["failed"][entry.name] = "; ".join(errors) or "Unknown error"
+			continue
 
-		# if account.get("account_number"):
-		#     return account.account_number
+		payment_id = xero_payment.get("PaymentID")
+		entry_updates[entry.name] = {"custom_xero_payment_id": payment_id}
+		reference_updates[ref.name] = {"custom_xero_payment_id": payment_id}
+		result["synced"].append(entry.name)
 
-		# Default fallback
-		return "880"  # Default bank account code
+	save_xero_payment_ids(entry_updates, reference_updates)
+
+
+def push_batch_payment(client, entry, references, account_code, payments, result):
+	"""PUT one BatchPayment for a Payment Entry settling several invoices"""
+	try:
+		response = client.make_request(
+			"PUT",
+			"/BatchPayments",
+			data={"BatchPayments": [build_batch_payment_payload(entry, account_code, payments)]},
+		)
+	except Exception as e:
+		result["failed"][entry.name] = str(e)
+		return
+
+	batch_payments = response.get("BatchPayments") if response else None
+	if not batch_payments or not batch_payments[0].get("BatchPaymentID"):
+		result["failed"][entry.name] = "Failed to create batch payment in Xero"
+		return
+
+	batch_payment = batch_payments[0]
+	reference_updates = {
+		ref.name: {"custom_xero_payment_id": xero_payment.get("PaymentID")}
+		for ref, xero_payment in zip(references, batch_payment.get("Payments") or [], strict=False)
+		if xero_payment.get("PaymentID")
+	}
+
+	save_xero_payment_ids(
+		{entry.name: {"custom_xero_payment_id": batch_payment["BatchPaymentID"]}}, reference_updates
+	)
+	result["synced"].append(entry.name)
+
+
+def save_xero_payment_ids(entry_updates, reference_updates):
+	"""Write the Xero payment IDs of Payment Entries and their references in bulk"""
+	if entry_updates:
+		frappe.db.bulk_update("Payment Entry", entry_updates, update_modified=False)
+	if reference_updates:
+		frappe.db.bulk_update("Payment Entry Reference", reference_updates, update_modified=False)
+	frappe.db.commit()
+
+
+@frappe.whitelist()
+def get_account_code(account_name):
+	"""Get account code for the given account"""
+	try:
+		return get_payment_account_code(account_name)
 
 	except Exception as e:
 		frappe.log_error("Get Account Code", f"Error getting account code for {account_name}: {str(e)}")
@@ -92,19 +357,7 @@ def get_account_code(account_name):
 def get_customer_contact_id(customer):
 	"""Get Xero contact ID for customer"""
 	try:
-		dynamic_links = frappe.get_all(
-			"Dynamic Link",
-			filters={"link_doctype": "Customer", "link_name": customer, "parenttype": "Contact"},
-			fields=["parent"],
-			limit=1,
-		)
-
-		if dynamic_links:
-			contact_name = dynamic_links[0].parent
-			contact = frappe.get_doc("Contact", contact_name)
-			return contact.get("custom_contact_id")
-
-		return None
+		return resolve_customer_contact_id(customer)
 	except Exception as e:
 		frappe.log_error(
 			"Get Customer Contact ID", f"Error getting contact id for customer {customer}: {str(e)}"
@@ -0,0 +1,215 @@
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+# Xero limits per connected tenant, plus the app-wide minute limit shared by all tenants
+MINUTE_LIMIT = 60
+DAY_LIMIT = 5000
+CONCURRENT_LIMIT = 5
+DEFAULT_MAX_WAIT = 60
+
+# A slot held longer than this is assumed to belong to a dead worker and is reclaimed
+SLOT_TIMEOUT = 120
+
+# Seconds to wait before asking again when every concurrency slot is taken
+SLOT_POLL_INTERVAL = 0.1
+
+MINUTE_WINDOW = 60
+DAY_WINDOW = 86400
+
+# Each budget is a sliding-window log: a sorted set with one entry per call sent in the
+# window, so no rolling window ever holds more calls than the limit. A minute entry, a
+# day entry and a concurrency slot are taken together, and nothing is recorded unless
+# all three are available, so a worker that has to wait never spends shared budget.
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local member = ARGV[6]
+
+local function window_wait(key, limit, window)
+	redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+	local count = redis.call('ZCARD', key)
+	if count < limit then
+		return 0
+	end
+	-- The call that has to leave the window before one more fits
+	local entry = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+	return math.max(0.01, tonumber(entry[2]) + window - now)
+end
+
+local wait = math.max(
+	window_wait(KEYS[1], tonumber(ARGV[2]), tonumber(ARGV[8])),
+	window_wait(KEYS[2], tonumber(ARGV[3]), tonumber(ARGV[9]))
+)
+if wait > 0 then
+	return tostring(wait)
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - tonumber(ARGV[5]))
+if redis.call('ZCARD', KEYS[3]) >= tonumber(ARGV[4]) then
+	return ARGV[7]
+end
+
+redis.call('ZADD', KEYS[1], now, member)
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+redis.call('ZADD', KEYS[2], now, member)
+redis.call('EXPIRE', KEYS[2], ARGV[9])
+redis.call('ZADD', KEYS[3], now, member)
+redis.call('EXPIRE', KEYS[3], ARGV[5])
+return '0'
+"""
+
+# Fill the window up to what Xero has counted when it reports fewer calls remaining than
+# we think; the added entries hold the budget at zero until a full window has passed
+CLAMP_WINDOW_SCRIPT = """
+local remaining = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local window = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local missing = limit - remaining - redis.call('ZCARD', KEYS[1])
+for i = 1, missing do
+	redis.call('ZADD', KEYS[1], now, 'xero:' .. ARGV[5] .. ':' .. i)
+end
+if missing > 0 then
+	redis.call('EXPIRE', KEYS[1], window)
+end
+return 1
+"""
+
+
+class XeroRateLimitError(Exception):
+	"""Raised when the Xero call budget will not free up within the allowed wait"""
+
+	def __init__(self, message, retry_after=None):
+		super().__init__(message)
+		self.retry_after = retry_after
+
+
+class XeroRateLimiter:
+	"""
+	Sliding-window scheduler for Xero API calls.
+
+	Windows live in Redis so the minute, day and concurrency budgets of a tenant are
+	shared by every web and RQ worker on the site. Calls are paced before Xero rejects
+	them, and the rate-limit headers of each response keep the windows in line with
+	what Xero has actually counted. The app-wide minute block is keyed by the Xero app,
+	not the site, since every site using the app shares it.
+	"""
+
+	def __init__(
+		self,
+		tenant_id,
+		per_minute=MINUTE_LIMIT,
+		per_day=DAY_LIMIT,
+		concurrency=CONCURRENT_LIMIT,
+		max_wait=DEFAULT_MAX_WAIT,
+		app_id=None,
+	):
+		self.tenant_id = tenant_id or "default"
+		self.per_minute = per_minute
+		self.per_day = per_day
+		self.concurrency = concurrency
+		self.max_wait = max_wait
+
+		cache = frappe.cache()
+		self.minute_key = cache.make_key(f"xero_rate_limit|{self.tenant_id}|minute_window")
+		self.day_key = cache.make_key(f"xero_rate_limit|{self.tenant_id}|day_window")
+		self.slots_key = cache.make_key(f"xero_rate_limit|{self.tenant_id}|slots")
+		self.blocked_key = cache.make_key(f"xero_rate_limit|{self.tenant_id}|blocked_until")
+		self.app_blocked_key = f"xero_rate_limit|app|{app_id or 'default'}|blocked_until"
+
+	@classmethod
+	def from_settings(cls, settings):
+		"""Build a limiter from the limits configured in Xero Settings"""
+		return cls(
+			settings.tenant_id,
+			per_minute=cint(settings.rate_limit_per_minute) or MINUTE_LIMIT,
+			per_day=cint(settings.rate_limit_per_day) or DAY_LIMIT,
+			concurrency=cint(settings.max_concurrent_requests) or CONCURRENT_LIMIT,
+			max_wait=cint(settings.rate_limit_max_wait) or DEFAULT_MAX_WAIT,
+			app_id=settings.client_id,
+		)
+
+	def acquire(self):
+		"""Wait until a call may be sent and return the concurrency slot it holds"""
+		deadline = time.time() + self.max_wait
+
+		while True:
+			slot = frappe.generate_hash(length=12)
+			wait = self._blocked_for() or self._try_acquire(slot)
+			if not wait:
+				return slot
+
+			if time.time() + wait > deadline:
+				raise XeroRateLimitError(
+					f"Xero rate limit reached for tenant {self.tenant_id}, retry in {int(wait)} seconds",
+					retry_after=wait,
+				)
+
+			time.sleep(wait)
+
+	def release(self, slot, response=None):
+		"""Free the slot and update the shared budget from the response headers"""
+		frappe.cache().zrem(self.slots_key, slot)
+
+		if response is None:
+			return
+
+		headers = response.headers
+		now = time.time()
+
+		if headers.get("X-MinLimit-Remaining") is not None:
+			self._clamp_window(
+				self.minute_key, cint(headers["X-MinLimit-Remaining"]), now, self.per_minute, MINUTE_WINDOW
+			)
+
+		if headers.get("X-DayLimit-Remaining") is not None:
+			self._clamp_window(
+				self.day_key, cint(headers["X-DayLimit-Remaining"]), now, self.per_day, DAY_WINDOW
+			)
+
+		if headers.get("X-AppMinLimit-Remaining") is not None and not cint(
+			headers["X-AppMinLimit-Remaining"]
+		):
+			self._block(self.app_blocked_key, now + 60)
+
+		if response.status_code == 429:
+			retry_after = flt(headers.get("Retry-After")) or 60
+			problem = (headers.get("X-Rate-Limit-Problem") or "").lower()
+			key = self.app_blocked_key if problem == "appminute" else self.blocked_key
+			self._block(key, now + retry_after)
+
+	def _blocked_for(self):
+		"""Seconds left until Xero accepts calls again after a 429"""
+		# Raw reads go to Redis every time, a block set after this job started must be seen
+		cache = frappe.cache()
+		blocked_until = max(flt(cache.get(self.blocked_key)), flt(cache.get(self.app_blocked_key)))
+		return max(0, blocked_until - time.time())
+
+	def _block(self, key, until):
+		frappe.cache().set(key, until, ex=max(1, int(until - time.time()) + 1))
+
+	def _try_acquire(self, slot):
+		"""Take the call budget and a slot in one step, or return the seconds to wait"""
+		script = frappe.cache().register_script(ACQUIRE_SCRIPT)
+		return flt(
+			script(
+				keys=[self.minute_key, self.day_key, self.slots_key],
+				args=[
+					time.time(),
+					self.per_minute,
+					self.per_day,
+					self.concurrency,
+					SLOT_TIMEOUT,
+					slot,
+					SLOT_POLL_INTERVAL,
+					MINUTE_WINDOW,
+					DAY_WINDOW,
+				],
+			)
+		)
+
+	def _clamp_window(self, key, remaining, now, limit, window):
+		script = frappe.cache().register_script(CLAMP_WINDOW_SCRIPT)
+		script(keys=[key], args=[remaining, now, limit, window, frappe.generate_hash(length=8)])
@@ -0,0 +1,153 @@
+import time
+from datetime import datetime, timezone
+
+import frappe
+from frappe.utils import cint
+
+from .base import get_xero_client, if_modified_since
+
+# Reference endpoints cached per tenant, by collection name
+REFERENCE_ENTITIES = ("Accounts", "TaxRates", "Currencies", "TrackingCategories")
+
+# Seconds before a cached collection is revalidated with If-Modified-Since
+DEFAULT_REFRESH_INTERVAL = 3600
+
+# Cached collections are kept this long so a failed revalidation can still serve them
+REFERENCE_CACHE_TTL = 7 * 86400
+
+DEFAULT_SALES_ACCOUNT_CODE = "200"
+DEFAULT_PAYMENT_ACCOUNT_CODE = "880"
+
+ACCOUNT_CODE_MAP_CACHE_KEY = "xero_account_code_map"
+
+
+@frappe.whitelist()
+def refresh_reference_data():
+	"""Reload every Xero reference collection and rebuild the account code map"""
+	try:
+		client = get_xero_client()
+		counts = {
+			entity: len(get_reference_data(entity, client, force=True)) for entity in REFERENCE_ENTITIES
+		}
+		clear_account_code_map()
+
+		return {"status": "success", "data": counts}
+
+	except Exception as e:
+		frappe.log_error("Xero Reference Data", f"Error refreshing reference data: {str(e)}")
+		return {"status": "error", "message": str(e)}
+
+
+def get_reference_data(entity, client=None, force=False):
+	"""
+	Get a Xero reference collection (Accounts, TaxRates, Currencies, TrackingCategories).
+
+	Collections are cached in Redis per tenant. Once older than the refresh interval
+	they are revalidated with If-Modified-Since, so an unchanged collection costs one
+	304 response; if Xero cannot be reached the cached copy is served.
+	"""
+	client = client or get_xero_client()
+	key = f"xero_reference|{client.tenant_id}|{entity}"
+	cached = frappe.cache().get_value(key)
+	refresh_interval = cint(client.settings.reference_data_ttl) or DEFAULT_REFRESH_INTERVAL
+
+	if cached and not force and time.time() - cached["fetched_at"] < refresh_interval:
+		return cached["items"]
+
+	fetched_at = time.time()
+	headers = None
+	if cached and not force:
+		headers = if_modified_since(
+			datetime.fromtimestamp(cached["fetched_at"], timezone.utc).replace(tzinfo=None)
+		)
+
+	try:
+		response = client.make_request("GET", f"/{entity}", headers=headers)
+	except Exception:
+		if not cached:
+			raise
+		frappe.log_error("Xero Reference Data", f"Serving cached {entity} after a failed refresh")
+		return cached["items"]
+
+	# A 304 comes back without the collection: the cached copy is still current
+	items = response[entity] if entity in response else cached["items"]
+	frappe.cache().set_value(
+		key, {"fetched_at": fetched_at, "items": items}, expires_in_sec=REFERENCE_CACHE_TTL
+	)
+
+	return items
+
+
+def get_account_code_map(client=None):
+	"""
+	Map of ERPNext Account name to Xero account code.
+
+	An Account maps to its Xero Account Code override, else to the Xero account with
+	the same account number, else to the Xero account with the same name.
+	"""
+	client = client or get_xero_client()
+	key = f"{ACCOUNT_CODE_MAP_CACHE_KEY}|{client.tenant_id}"
+	account_map = frappe.cache().get_value(key)
+
+	if account_map is None:
+		account_map = build_account_code_map(get_reference_data("Accounts", client))
+		refresh_interval = cint(client.settings.reference_data_ttl) or DEFAULT_REFRESH_INTERVAL
+		frappe.cache().set_value(key, account_map, expires_in_sec=refresh_interval)
+
+	return account_map
+
+
+def build_account_code_map(xero_accounts):
+	xero_accounts = [
+		account for account in xero_accounts if account.get("Code") and account.get("Status") != "ARCHIVED"
+	]
+	codes = {account["Code"] for account in xero_accounts}
+	codes_by_name = {
+		(account.get("Name") or "").strip().lower(): account["Code"] for account in xero_accounts
+	}
+
+	account_map = {}
+	for account in frappe.get_all(
+		"Account",
+		filters={"is_group": 0},
+		fields=["name", "account_name", "account_number", "custom_xero_account_code"],
+	):
+		code = (
+			account.custom_xero_account_code
+			or (account.account_number if account.account_number in codes else None)
+			or codes_by_name.get((account.account_name or "").strip().lower())
+		)
+		if code:
+			account_map[account.name] = code
+
+	return account_map
+
+
+def clear_account_code_map(doc=None, method=None):
+	"""Drop the cached account code maps; also the Account on_update and on_trash doc event"""
+	frappe.cache().delete_keys(f"{ACCOUNT_CODE_MAP_CACHE_KEY}|")
+
+
+def get_sales_account_code(income_account, client=None):
+	"""Xero account code for an invoice line posted to the given income account"""
+	client = client or get_xero_client()
+	return (
+		get_account_code_map(client).get(income_account)
+		or client.settings.default_sales_account_code
+		or DEFAULT_SALES_ACCOUNT_CODE
+	)
+
+
+def get_payment_account_code(paid_to, client=None):
+	"""Xero account code for a payment received into the given account"""
+	client = client or get_xero_client()
+	return (
+		get_account_code_map(client).get(paid_to)
+		or client.settings.default_payment_account_code
+		or DEFAULT_PAYMENT_ACCOUNT_CODE
+	)
+
+
+def get_currency_codes(client=None):
+	"""Currency codes enabled in the Xero organisation"""
+	return {currency["Code"] for currency in get_reference_data("Currencies", client)}
@@ -1,67 +1,140 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 import frappe
-from frappe.utils import flt
-
-from .base import get_xero_client
+from frappe.utils import cint, create_batch, flt
+
+from ..doctype.xero_sync_cursor.xero_sync_cursor import (
+	WATERMARK_OVERLAP,
+	get_retry_ids,
+	get_watermark,
+	next_retry_ids,
+	set_watermark,
+)
+from ..doctype.xero_sync_run.xero_sync_run import sync_run
+from .base import get_xero_client, if_modified_since, parse_xero_date
+from .contact import build_contact_payload, get_customer_contact_ids, to_mirror_row, to_xero_contact
+from .contact import get_customer_contact_id as resolve_customer_contact_id
+from .contact_matcher import ContactIndex, match_contacts
+from .payment_accounts import get_payment_accounts, resolve_payment_accounts
+from .reference_data import get_currency_codes, get_sales_account_code
+from .tracing import span, traced
+
+# Xero accepts up to 50 invoices per POST
+INVOICE_BATCH_SIZE = 50
 
 
 @frappe.whitelist()
-def sync_invoice_payments():
-	"""Sync payment status from Xero and create payment entries for paid invoices"""
+def sync_invoice_payments(full=False):
+	"""
+	Sync payment status from Xero and create payment entries for paid invoices.
+
+	Runs only look at invoices and payments modified in Xero since the watermarks of the
+	last successful run. A full sync re-checks every unpaid invoice; it runs on request and
+	whenever no watermark exists yet. Invoices whose Payment Entry could not be created
+	are kept on a retry list and fetched by ID on the next runs, up to MAX_RETRY_ATTEMPTS.
+	"""
 	try:
-		# Get unpaid invoices from ERPNext that have Xero invoice numbers
-		unpaid_invoices = frappe.get_all(
-			"Sales Invoice",
-			filters={"custom_xero_invoice_number": ["is", "set"], "status": ["in", ["Unpaid", "Overdue"]]},
-			fields=[
-				"name",
-				"customer",
-				"grand_total",
-				"outstanding_amount",
-				"custom_xero_invoice_number",
-				"company",
-			],
-		)
-
-		if not unpaid_invoices:
-			return {"status": "success", "message": "No unpaid invoices found with Xero references"}
-
-		# Get Xero invoice IDs
-		invoice_ids = [invoice.custom_xero_invoice_number for invoice in unpaid_invoices]
-		invoice_ids_str = ",".join(invoice_ids)
-
-		# Fetch invoice details from Xero
-		client = get_xero_client()
-		response = client.make_request("GET", f"/invoices?IDs={invoice_ids_str}")
-
-		xero_invoices = response.get("Invoices", [])
-		processed_invoices = []
-
-		for xero_invoice in xero_invoices:
-			invoice_id = xero_invoice.get("InvoiceID")
-			status = xero_invoice.get("Status")
-			amount_paid = flt(xero_invoice.get("AmountPaid", 0))
-
-			# Find corresponding ERPNext invoice
-			erpnext_invoice = None
-			for inv in unpaid_invoices:
-				if inv.custom_xero_invoice_number == invoice_id:
-					erpnext_invoice = inv
-					break
-
-			if not erpnext_invoice:
-				continue
-
-			# Check if invoice is paid or partially paid in Xero
-			if status in ["PAID", "AUTHORISED"] and amount_paid > 0:
-				payment_result = create_payment_entry_from_xero(erpnext_invoice, xero_invoice, amount_paid)
-				processed_invoices.append(
-					{
-						"invoice": erpnext_invoice.name,
-						"amount_paid": amount_paid,
-					}
+		with sync_run("Invoice Payments", full) as run:
+			client = get_xero_client()
+			run.tenant_id = client.tenant_id
+			started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+			invoice_watermark = get_watermark("Invoices", client.tenant_id)
+			payment_watermark = get_watermark("Payments", client.tenant_id)
+			retry_ids = get_retry_ids("Invoices", client.tenant_id)
+			incremental = not cint(full) and invoice_watermark and payment_watermark
+
+			# All payments modified since the last run in one paged fetch, indexed by invoice
+			payments_by_invoice = {}
+			if payment_watermark:
+				for payment in client.get_paged(
+					"Payments", "Payments", headers=if_modified_since(payment_watermark)
+				):
+					invoice_id = (payment.get("Invoice") or {}).get("InvoiceID")
+					if invoice_id:
+						payments_by_invoice.setdefault(invoice_id, []).append(payment)
+
+			filters = {"custom_xero_invoice_number": ["is", "set"], "status": ["in", ["Unpaid", "Overdue"]]}
+			if incremental:
+				xero_invoices = get_modified_xero_invoices(
+					client, invoice_watermark, payments_by_invoice, retry_ids
 				)
+				filters["custom_xero_invoice_number"] = [
+					"in",
+					[inv.get("InvoiceID") for inv in xero_invoices],
+				]
+
+			# Get unpaid invoices from ERPNext that have Xero invoice numbers
+			unpaid_invoices = []
+			if not incremental or xero_invoices:
+				with span("db.unpaid_invoices"):
+					unpaid_invoices = frappe.get_all(
+						"Sales Invoice",
+						filters=filters,
+						fields=[
+							"name",
+							"customer",
+							"grand_total",
+							"outstanding_amount",
+							"custom_xero_invoice_number",
+							"company",
+						],
+					)
+
+			# Index ERPNext invoices by their Xero invoice ID
+			invoices_by_xero_id = {invoice.custom_xero_invoice_number: invoice for invoice in unpaid_invoices}
+
+			# Fetch invoice details from Xero, in URL-safe chunks and across all pages
+			if not incremental:
+				xero_invoices = client.get_paged("Invoices", "Invoices", ids=list(invoices_by_xero_id))
+
+			# ERPNext data for every invoice of the run, loaded with set-based queries
+			context = get_payment_sync_context(unpaid_invoices)
+			processed_invoices = []
+			failed_ids = []
+
+			for xero_invoice in xero_invoices:
+				run.add(scanned=1)
+				invoice_id = xero_invoice.get("InvoiceID")
+				status = xero_invoice.get("Status")
+				amount_paid = flt(xero_invoice.get("AmountPaid", 0))
+
+				# Find corresponding ERPNext invoice
+				erpnext_invoice = invoices_by_xero_id.get(invoice_id)
+				if not erpnext_invoice:
+					continue
+				run.add(matched=1)
+
+				# Check if invoice is paid or partially paid in Xero
+				if status in ["PAID", "AUTHORISED"] and amount_paid > 0:
+					payment_result = create_payment_entry_from_xero(
+						erpnext_invoice,
+						xero_invoice,
+						amount_paid,
+						payments=payments_by_invoice.get(invoice_id),
+						context=context,
+					)
+					processed_invoices.append(
+						{
+							"invoice": erpnext_invoice.name,
+							"amount_paid": amount_paid,
+						}
+					)
+					if payment_result.get("status") == "success":
+						run.add(created=1)
+						continue
+					if payment_result.get("status") == "error":
+						failed_ids.append(invoice_id)
+
+				run.add(skipped=1)
+
+			# Overlap the next window a little to allow for clock skew with Xero
+			watermark = started_at - WATERMARK_OVERLAP
+			set_watermark(
+				"Invoices", client.tenant_id, watermark, next_retry_ids("Invoices", retry_ids, failed_ids)
+			)
+			set_watermark("Payments", client.tenant_id, watermark)
+			run.watermark = watermark
 
 		return {
 			"status": "success",
@@ -74,143 +147,154 @@ def sync_invoice_payments():
 		return {"status": "error", "message": str(e)}
 
 
-def create_payment_entry_from_xero(erpnext_invoice, xero_invoice, amount_paid):
-	"""Create payment entry in ERPNext based on Xero payment data"""
+def get_modified_xero_invoices(client, invoice_watermark, payments_by_invoice, retry_ids=()):
+	"""
+	Get sales invoices changed in Xero since the watermark, including ones that only got
+	a payment and the ones to retry after failing in an earlier run
+	"""
+	xero_invoices = {
+		invoice.get("InvoiceID"): invoice
+		for invoice in client.get_paged(
+			"Invoices",
+			"Invoices",
+			params={"where": 'Type=="ACCREC"'},
+			headers=if_modified_since(invoice_watermark),
+		)
+	}
+
+	missing_ids = [
+		invoice_id for invoice_id in {*payments_by_invoice, *retry_ids} if invoice_id not in xero_invoices
+	]
+	for invoice in client.get_paged("Invoices", "Invoices", ids=missing_ids):
+		xero_invoices[invoice.get("InvoiceID")] = invoice
+
+	return list(xero_invoices.values())
+
+
+@traced("db.payment_sync_context")
+def get_payment_sync_context(invoices):
+	"""
+	Prefetch the ERPNext data needed to create Payment Entries for a set of invoices:
+	amounts already allocated per invoice and the accounts of each company and customer.
+	"""
+	context = {"allocated": {}, "accounts": {}}
+	if not invoices:
+		return context
+
+	invoice_names = list({invoice.name for invoice in invoices})
+
+	for row in frappe.get_all(
+		"Payment Entry Reference",
+		filters={
+			"parenttype": "Payment Entry",
+			"reference_doctype": "Sales Invoice",
+			"reference_name": ["in", invoice_names],
+			"docstatus": 1,
+		},
+		fields=["reference_name", "sum(allocated_amount) as allocated_amount"],
+		group_by="reference_name",
+	):
+		context["allocated"][row.reference_name] = flt(row.allocated_amount)
+
+	context["accounts"] = resolve_payment_accounts(
+		{(invoice.company, invoice.customer) for invoice in invoices}
+	)
+
+	return context
+
+
+@traced("payment_entry.create")
+def create_payment_entry_from_xero(erpnext_invoice, xero_invoice, amount_paid, payments=None, context=None):
+	"""
+	Create payment entry in ERPNext based on Xero payment data.
+
+	`payments` are the Xero payments of the invoice and `context` comes from
+	get_payment_sync_context; both are looked up when the caller does not pass them.
+	"""
 	try:
-		# Get payment details from Xero
 		invoice_id = xero_invoice.get("InvoiceID")
-		client = get_xero_client()
 
-		# Fetch payments for this specific invoice
-		payments_response = client.make_request(
-			"GET", f"/Payments?where=Invoice.InvoiceID%3DGuid%28%22{invoice_id}%22%29"
-		)
-		payments = payments_response.get("Payments", [])
+		# Payments indexed by the sync run, else the ones embedded in the invoice
+		payments = payments or xero_invoice.get("Payments")
+		if not payments:
+			payments = get_xero_client().get_payments(invoice_id)
 
 		if not payments:
 			return {"status": "error", "message": "No payments found in Xero"}
 
-		# Get the Sales Invoice document
-		sales_invoice = frappe.get_doc("Sales Invoice", erpnext_invoice.name)
+		if context is None:
+			context = get_payment_sync_context([erpnext_invoice])
 
-		# Check if payment entry already exists
-		existing_payments = frappe.get_all(
-			"Payment Entry",
-			filters={
-				"reference_doctype": "Sales Invoice",
-				"reference_name": sales_invoice.name,
-				"docstatus": 1,
-			},
-			fields=["name", "paid_amount"],
-		)
+		company = erpnext_invoice.company
+		customer = erpnext_invoice.customer
 
-		total_existing_payments = sum([flt(pe.paid_amount) for pe in existing_payments])
+		# Check if payment entry already exists
+		total_existing_payments = context["allocated"].get(erpnext_invoice.name, 0)
 		remaining_amount = flt(amount_paid) - total_existing_payments
 
 		if remaining_amount <= 0:
 			return {"status": "info", "message": "Payment already recorded"}
 
 		# Get the latest payment from Xero for reference
-		latest_payment = max(payments, key=lambda x: x.get("UpdatedDateUTC", ""))
-		payment_date = latest_payment.get("Date", "")
-
-		# Parse Xero date format
-		if payment_date:
-			# Xero date format: /Date(1234567890000+0000)/
-			import re
-
-			date_match = re.search(r"/Date\((\d+)", payment_date)
-			if date_match:
-				timestamp = int(date_match.group(1)) / 1000
-				payment_date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
-			else:
-				payment_date = frappe.utils.today()
-		else:
-			payment_date = frappe.utils.today()
+		latest_payment = max(payments, key=lambda x: x.get("UpdatedDateUTC", "") or x.get("Date", ""))
+		payment_date = parse_xero_date(latest_payment.get("Date"))
+		payment_date = payment_date.strftime("%Y-%m-%d") if payment_date else frappe.utils.today()
 
 		# Create Payment Entry
 		payment_entry = frappe.new_doc("Payment Entry")
 		payment_entry.payment_type = "Receive"
 		payment_entry.party_type = "Customer"
-		payment_entry.party = sales_invoice.customer
+		payment_entry.party = customer
 		payment_entry.mode_of_payment = "Cash"
-		payment_entry.company = sales_invoice.company
+		payment_entry.company = company
 		payment_entry.posting_date = payment_date
 		payment_entry.paid_amount = remaining_amount
 		payment_entry.received_amount = remaining_amount
-		payment_entry.reference_no = latest_payment.get("Reference", f"Xero-{invoice_id[:8]}")
+		payment_entry.reference_no = latest_payment.get("Reference") or f"Xero-{invoice_id[:8]}"
 		payment_entry.reference_date = payment_date
-		payment_entry.remarks = f"Payment synced from Xero for Invoice {sales_invoice.name}"
+		payment_entry.remarks = f"Payment synced from Xero for Invoice {erpnext_invoice.name}"
 
-		# Set accounts
-		company_doc = frappe.get_doc("Company", sales_invoice.company)
+		# Mark it as Xero's own payment so it is never pushed back as a new one
+		payment_entry.custom_from_xero = 1
+		payment_entry.custom_xero_payment_id = latest_payment.get("PaymentID")
 
-		# Get the default cash account for the company
-		paid_to_account = None
-		if hasattr(company_doc, "default_cash_account") and company_doc.default_cash_account:
-			paid_to_account = company_doc.default_cash_account
-		elif hasattr(company_doc, "default_bank_account") and company_doc.default_bank_account:
-			paid_to_account = company_doc.default_bank_account
-		else:
-			# Fallback: find the first cash/bank account for this company
-			cash_accounts = frappe.get_all(
-				"Account",
-				filters={
-					"company": sales_invoice.company,
-					"account_type": ["in", ["Cash", "Bank"]],
-					"is_group": 0,
-				},
-				fields=["name"],
-				limit=1,
-			)
-			if cash_accounts:
-				paid_to_account = cash_accounts[0].name
+		# Receivable and cash/bank accounts resolved for the whole run
+		accounts = context["accounts"].get((company, customer)) or get_payment_accounts(company, customer)
 
-		if not paid_to_account:
+		if not accounts.paid_to:
 			return {
 				"status": "error",
-				"message": f"No cash/bank account found for company {sales_invoice.company}",
+				"message": f"No cash/bank account found for company {company}",
 			}
 
-		payment_entry.paid_to = paid_to_account
-
-		# Get customer's receivable account
-		customer_doc = frappe.get_doc("Customer", sales_invoice.customer)
-		if hasattr(customer_doc, "accounts") and customer_doc.accounts:
-			for acc in customer_doc.accounts:
-				if acc.company == sales_invoice.company:
-					payment_entry.paid_from = acc.account
-					break
-
-		if not payment_entry.paid_from:
-			# Fallback to default receivable account
-			receivable_accounts = frappe.get_all(
-				"Account",
-				filters={"company": sales_invoice.company, "account_type": "Receivable", "is_group": 0},
-				fields=["name"],
-				limit=1,
-			)
-			if receivable_accounts:
-				payment_entry.paid_from = receivable_accounts[0].name
-			else:
-				return {
-					"status": "error",
-					"message": f"No receivable account found for company {sales_invoice.company}",
-				}
+		if not accounts.paid_from:
+			return {
+				"status": "error",
+				"message": f"No receivable account found for company {company}",
+			}
+
+		payment_entry.paid_from = accounts.paid_from
+		payment_entry.paid_to = accounts.paid_to
 
 		# Add reference to the Sales Invoice
 		payment_entry.append(
 			"references",
 			{
 				"reference_doctype": "Sales Invoice",
-				"reference_name": sales_invoice.name,
+				"reference_name": erpnext_invoice.name,
 				"allocated_amount": remaining_amount,
+				"custom_xero_payment_id": latest_payment.get("PaymentID"),
 			},
 		)
 
 		# Save and submit
-		payment_entry.insert()
-		payment_entry.submit()
+		with span("payment_entry.insert"):
+			payment_entry.insert()
+		with span("payment_entry.submit"):
+			payment_entry.submit()
+
+		# Keep the run's totals current in case Xero returns the invoice twice
+		context["allocated"][erpnext_invoice.name] = total_existing_payments + remaining_amount
 
 		return {
 			"status": "success",
@@ -235,45 +319,7 @@ def create_invoice(doc, method=None, update=False):
 		elif hasattr(doc, "doctype") and doc.doctype == "Sales Invoice":
 			invoice = doc
 
-		# Get customer contact ID from Xero
-		contact_id = get_customer_contact_id(invoice.customer)
-		if not contact_id:
-			frappe.throw(f"No Xero contact ID found for customer: {invoice.customer}")
-
-		# Prepare line items
-		line_items = []
-		for item in invoice.items:
-			line_item = {
-				"Description": item.description or item.item_name,
-				"Quantity": str(item.qty),
-				"UnitAmount": str(item.rate),
-				"AccountCode": item.get("custom_account_code") or "200",
-			}
-
-			# Add discount rate if available
-			if item.get("discount_percentage"):
-				line_item["DiscountRate"] = str(item.discount_percentage)
-
-			line_items.append(line_item)
-
-		# Prepare invoice data
-		invoice_data = {
-			"Type": "ACCREC",
-			"Contact": {"ContactID": contact_id},
-			"InvoiceNumber": invoice.name,  # Use Sales Invoice name as invoice number
-			"DateString": invoice.posting_date.strftime("%Y-%m-%d") if invoice.posting_date else None,
-			"DueDateString": invoice.due_date.strftime("%Y-%m-%d") if invoice.due_date else None,
-			"LineAmountTypes": "Exclusive",
-			"LineItems": line_items,
-			"Reference": invoice.name,
-			"Status": "AUTHORISED",
-		}
-
-		# Add currency if different from base currency
-		if invoice.currency and invoice.currency != frappe.get_cached_value(
-			"Company", invoice.company, "default_currency"
-		):
-			invoice_data["CurrencyCode"] = invoice.currency
+		invoice_data = build_invoice_payload(invoice)
 
 		data = {"Invoices": [invoice_data]}
 		if update:
@@ -299,32 +345,181 @@ def create_invoice(doc, method=None, update=False):
 		frappe.throw(f"Failed to create invoice in Xero: {str(e)}")
 
 
+def build_invoice_payload(invoice, contact_ids=None):
+	"""Build the Xero invoice payload for a Sales Invoice, optionally with pre-resolved ContactIDs"""
+	# Get customer contact ID from Xero
+	if contact_ids is None:
+		contact_ids = get_customer_contact_ids([invoice.customer])
+	contact_id = contact_ids.get(invoice.customer)
+	if not contact_id:
+		frappe.throw(f"No Xero contact ID found for customer: {invoice.customer}")
+
+	# Prepare line items
+	line_items = []
+	for item in invoice.items:
+		line_item = {
+			"Description": item.description or item.item_name,
+			"Quantity": str(item.qty),
+			"UnitAmount": str(item.rate),
+			"AccountCode": item.get("custom_account_code") or get_sales_account_code(item.income_account),
+		}
+
+		# Add discount rate if available
+		if item.get("discount_percentage"):
+			line_item["DiscountRate"] = str(item.discount_percentage)
+
+		line_items.append(line_item)
+
+	# Prepare invoice data
+	invoice_data = {
+		"Type": "ACCREC",
+		"Contact": {"ContactID": contact_id},
+		"InvoiceNumber": invoice.name,  # Use Sales Invoice name as invoice number
+		"DateString": invoice.posting_date.strftime("%Y-%m-%d") if invoice.posting_date else None,
+		"DueDateString": invoice.due_date.strftime("%Y-%m-%d") if invoice.due_date else None,
+		"LineAmountTypes": "Exclusive",
+		"LineItems": line_items,
+		"Reference": invoice.name,
+		"Status": "AUTHORISED",
+	}
+
+	# Add currency if different from base currency
+	if invoice.currency and invoice.currency != frappe.get_cached_value(
+		"Company", invoice.company, "default_currency"
+	):
+		if invoice.currency not in get_currency_codes():
+			frappe.throw(f"Currency {invoice.currency} is not enabled in Xero")
+		invoice_data["CurrencyCode"] = invoice.currency
+
+	return invoice_data
+
+
 @frappe.whitelist()
-def fetch_xero_contacts(contact_person):
-	"""Fetch contacts from Xero and filter by similar names to contact person"""
+def push_invoices_to_xero(invoice_names):
+	"""Queue a bulk push of Sales Invoices to Xero"""
+	invoice_names = frappe.parse_json(invoice_names) if isinstance(invoice_names, str) else invoice_names
+
+	frappe.enqueue(
+		"xero_erpnext_integration.xero_erpnext_integration.apis.sales_invoice.push_invoices",
+		queue="long",
+		timeout=3600,
+		invoice_names=invoice_names,
+	)
+
+	return {"status": "success", "message": f"Queued {len(invoice_names)} invoices for sync to Xero"}
+
+
+def push_invoices(invoice_names):
+	"""Create Sales Invoices in Xero, up to INVOICE_BATCH_SIZE per request"""
+	# Only submitted invoices that have not been pushed yet
+	pending = frappe.get_all(
+		"Sales Invoice",
+		filters={
+			"name": ["in", invoice_names],
+			"docstatus": 1,
+			"custom_xero_invoice_number": ["is", "not set"],
+			"custom_do_not_sync_to_xero": 0,
+		},
+		pluck="name",
+	)
+
+	client = get_xero_client()
+	result = {"created": [], "failed": {}}
+
+	for batch in create_batch(pending, INVOICE_BATCH_SIZE):
+		invoices = [frappe.get_doc("Sales Invoice", name) for name in batch]
+		contact_ids = get_customer_contact_ids([invoice.customer for invoice in invoices])
+
+		payloads = {}
+		for invoice in invoices:
+			try:
+				payloads[invoice.name] = build_invoice_payload(invoice, contact_ids)
+			except Exception as e:
+				result["failed"][invoice.name] = str(e)
+
+		if payloads:
+			push_invoice_batch(client, payloads, result)
+
+		for name, error in result["failed"].items():
+			if name in batch:
+				frappe.db.set_value(
+					"Sales Invoice", name, "custom_xero_sync_error", error, update_modified=False
+				)
+
+		frappe.db.commit()
+
+	return result
+
+
+def push_invoice_batch(client, payloads, result):
+	"""POST one batch of invoices and map every returned element back to its Sales Invoice"""
+	names = list(payloads)
+
 	try:
-		client = get_xero_client()
-		response = client.make_request("GET", "/Contacts")
+		response = client.make_request(
+			"POST",
+			"/Invoices",
+			data={"Invoices": list(payloads.values())},
+			params={"summarizeErrors": "false"},
+		)
+	except Exception as e:
+		for name in names:
+			result["failed"][name] = str(e)
+		return
+
+	# With summarizeErrors=false Xero returns one element per invoice, in request order
+	for position, xero_invoice in enumerate(response.get("Invoices", [])):
+		name = xero_invoice.get("InvoiceNumber")
+		if name not in payloads:
+			name = names[position] if position < len(names) else None
+		if not name:
+			continue
+
+		if xero_invoice.get("HasErrors") or xero_invoice.get("StatusAttributeString") == "ERROR":
+			errors = [error.get("Message") for error in xero_invoice.get("ValidationErrors") or []]
+			result["failed"][name] = "; ".join(errors) or "Unknown error"
+			continue
+
+		frappe.db.set_value(
+			"Sales Invoice",
+			name,
+			{"custom_xero_invoice_number": xero_invoice.get("InvoiceID"), "custom_xero_sync_error": None},
+			update_modified=False,
+		)
+		result["created"].append(name)
 
-		xero_contacts = response.get("Contacts", [])
-		contact_doc = frappe.get_doc("Contact", contact_person)
-		contact_name = contact_doc.name or ""
 
-		# Filter contacts with similar names
-		similar_contacts = []
-		for contact in xero_contacts:
-			xero_name = contact.get("Name", "").lower()
-			contact_name_lower = contact_name.lower()
+@frappe.whitelist()
+def fetch_xero_contacts(contact_person):
+	"""Rank contacts in the Xero Contact mirror by similarity to the contact person"""
+	try:
+		contact = frappe.db.get_value(
+			"Contact", contact_person, ["name", "email_id", "custom_account_number"], as_dict=True
+		) or frappe._dict(name=contact_person)
+
+		# Contacts pushed from ERPNext use the Contact name and account number in Xero
+		query = {
+			"name": contact.name,
+			"email": contact.email_id,
+			"account_number": contact.custom_account_number or contact.name,
+		}
 
-			# Simple similarity check - contains or partial match
-			if (
-				xero_name in contact_name_lower
-				or contact_name_lower in xero_name
-				or any(word in xero_name for word in contact_name_lower.split() if len(word) > 2)
-			):
-				similar_contacts.append(contact)
+		if frappe.get_all("Xero Contact", limit=1):
+			matches = match_contacts(**query)
+		else:
+			# Mirror not loaded yet: queue the full load and ask Xero directly this once
+			frappe.enqueue(
+				"xero_erpnext_integration.xero_erpnext_integration.apis.contact.sync_xero_contacts",
+				queue="long",
+				full=True,
+				job_id="xero_contact_mirror_full_sync",
+				deduplicate=True,
+			)
+			response = get_xero_client().make_request("GET", "/Contacts")
+			index = ContactIndex(frappe._dict(to_mirror_row(row)) for row in response.get("Contacts", []))
+			matches = index.search(**query)
 
-		return similar_contacts
+		return [to_xero_contact(row) for row, score in matches]
 
 	except Exception as e:
 		frappe.log_error(f"Failed to fetch Xero contacts: {str(e)}", "Fetch Xero Contacts")
@@ -338,37 +533,10 @@ def create_contact_and_map(contact_person, sales_invoice):
 		# Get contact details from ERPNext
 		contact_doc = frappe.get_doc("Contact", contact_person)
 
-		# Check customer and supplier links
-		is_customer = False
-		is_supplier = False
-
-		if hasattr(contact_doc, "links") and contact_doc.links:
-			for link in contact_doc.links:
-				if link.link_doctype == "Customer":
-					is_customer = True
-				if link.link_doctype == "Supplier":
-					is_supplier = True
-
 		# Create contact in Xero
 		client = get_xero_client()
-		contact_data = {
-			"Name": contact_doc.name,
-			"FirstName": contact_doc.first_name or "",
-			"LastName": contact_doc.last_name or "",
-			"EmailAddress": contact_doc.email_id or "",
-			"AccountNumber": contact_doc.custom_account_number or contact_doc.name,
-			"IsCustomer": is_customer,
-			"IsSupplier": is_supplier,
-			"Addresses": [
-				{
-					"AddressType": "STREET",
-					"AddressLine1": contact_doc.address or "",
-				}
-			],
-			"Phones": [
-				{"PhoneType": "DEFAULT", "PhoneNumber": contact_doc.phone or contact_doc.mobile_no or ""}
-			],
-		}
+		link_doctypes = {link.link_doctype for link in contact_doc.links or []}
+		contact_data = build_contact_payload(contact_doc, link_doctypes)
 
 		data = {"Contacts": [contact_data]}
 		response = client.make_request("POST", "/Contacts", data=data)
@@ -464,18 +632,6 @@ def cancel_invoice_in_xero(xero_invoice_id):
 def get_customer_contact_id(customer):
 	"""Get customer contact ID from Xero"""
 	try:
-		dynamic_links = frappe.get_all(
-			"Dynamic Link",
-			filters={"link_doctype": "Customer", "link_name": customer, "parenttype": "Contact"},
-			fields=["parent"],
-			limit=1,
-		)
-
-		if dynamic_links:
-			contact_name = dynamic_links[0].parent
-			contact = frappe.get_doc("Contact", contact_name)
-			return contact.get("custom_contact_id")
-
-		return None
+		return resolve_customer_contact_id(customer)
 	except Exception as e:
 		frappe.throw("Error getting contact id for the selected customer")
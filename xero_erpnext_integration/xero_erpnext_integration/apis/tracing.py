@@ -0,0 +1,196 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import secrets
+import time
+from contextlib import contextmanager
+
+import frappe
+import requests
+from frappe.utils import flt
+
+SERVICE_NAME = "xero_erpnext_integration"
+
+DEFAULT_TRACE_FILE = "xero_traces.jsonl"
+DEFAULT_COLLECTOR_ENDPOINT = "http://localhost:4318/v1/traces"
+COLLECTOR_TIMEOUT = 2
+
+# Spans kept per trace; a long sync run keeps its first spans and counts the rest
+MAX_SPANS_PER_TRACE = 10000
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Span in progress for this context; NOT_SAMPLED marks a trace that records nothing
+_current_span = contextvars.ContextVar("xero_current_span", default=None)
+NOT_SAMPLED = object()
+
+
+class Trace:
+	"""Finished spans of one trace, exported together when its root span ends"""
+
+	def __init__(self):
+		self.trace_id = secrets.token_hex(16)
+		self.spans = []
+		self.dropped = 0
+
+	def add(self, span):
+		# list.append is atomic, so worker threads of get_paged can add spans directly
+		if len(self.spans) < MAX_SPANS_PER_TRACE:
+			self.spans.append(span)
+		else:
+			self.dropped += 1
+
+
+class Span:
+	def __init__(self, name, trace, parent=None, kind=SPAN_KIND_INTERNAL, attributes=None):
+		self.name = name
+		self.trace = trace
+		self.span_id = secrets.token_hex(8)
+		self.parent_id = parent.span_id if parent else None
+		self.kind = kind
+		self.attributes = dict(attributes or {})
+		self.start = time.time_ns()
+		self.end = None
+		self.error = None
+
+	def set(self, **attributes):
+		self.attributes.update(attributes)
+
+	def to_otlp(self):
+		span = {
+			"traceId": self.trace.trace_id,
+			"spanId": self.span_id,
+			"name": self.name,
+			"kind": self.kind,
+			"startTimeUnixNano": str(self.start),
+			"endTimeUnixNano": str(self.end),
+			"attributes": to_otlp_attributes(self.attributes),
+			"status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+		}
+		if self.parent_id:
+			span["parentSpanId"] = self.parent_id
+		return span
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+	"""
+	Time a block as a span of the current trace.
+
+	Without a parent the block starts a new trace, sampled at the Tracing Sample Rate
+	of Xero Settings; spans of an unsampled trace cost one context lookup. The span,
+	or None when not sampled, is yielded so the block can add attributes.
+	"""
+	parent = _current_span.get()
+	if parent is NOT_SAMPLED or (parent is None and not sample_trace()):
+		token = _current_span.set(NOT_SAMPLED)
+		try:
+			yield None
+		finally:
+			_current_span.reset(token)
+		return
+
+	current = Span(name, parent.trace if parent else Trace(), parent, kind, attributes)
+	token = _current_span.set(current)
+	try:
+		yield current
+	except Exception as e:
+		current.error = f"{type(e).__name__}: {e}"
+		raise
+	finally:
+		_current_span.reset(token)
+		current.end = time.time_ns()
+		current.trace.add(current)
+		if parent is None:
+			export_trace(current.trace)
+
+
+def traced(name=None, kind=SPAN_KIND_INTERNAL):
+	"""Decorator running the whole function in a span named after it"""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			with span(name or fn.__name__, kind):
+				return fn(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+def set_span_attributes(**attributes):
+	"""Add attributes to the span in progress, if it is sampled"""
+	current = _current_span.get()
+	if isinstance(current, Span):
+		current.set(**attributes)
+
+
+def sample_trace():
+	sample_rate = flt(frappe.db.get_single_value("Xero Settings", "tracing_sample_rate", cache=True))
+	return sample_rate > 0 and random.random() * 100 < sample_rate
+
+
+def to_otlp_attributes(attributes):
+	values = []
+	for key, value in attributes.items():
+		if value is None:
+			continue
+		if isinstance(value, bool):
+			values.append({"key": key, "value": {"boolValue": value}})
+		elif isinstance(value, int):
+			values.append({"key": key, "value": {"intValue": str(value)}})
+		elif isinstance(value, float):
+			values.append({"key": key, "value": {"doubleValue": value}})
+		else:
+			values.append({"key": key, "value": {"stringValue": str(value)}})
+	return values
+
+
+def export_trace(trace):
+	"""Write a finished trace as OTLP JSON to the configured file or collector; never raises"""
+	try:
+		settings = frappe.get_cached_doc("Xero Settings")
+		resource = {"service.name": SERVICE_NAME, "frappe.site": frappe.local.site}
+		if trace.dropped:
+			resource["xero.dropped_spans"] = trace.dropped
+
+		payload = {
+			"resourceSpans": [
+				{
+					"resource": {"attributes": to_otlp_attributes(resource)},
+					"scopeSpans": [
+						{
+							"scope": {"name": SERVICE_NAME},
+							"spans": [finished.to_otlp() for finished in trace.spans],
+						}
+					],
+				}
+			]
+		}
+
+		if settings.tracing_exporter == "OTLP Collector":
+			requests.post(
+				settings.tracing_endpoint or DEFAULT_COLLECTOR_ENDPOINT,
+				json=payload,
+				timeout=COLLECTOR_TIMEOUT,
+			).raise_for_status()
+			return
+
+		# One OTLP JSON document per line, as read by the collector's file receiver
+		path = settings.tracing_file or DEFAULT_TRACE_FILE
+		if not os.path.isabs(path):
+			path = frappe.get_site_path("logs", path)
+		with open(path, "a") as trace_file:
+			trace_file.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+	except Exception as e:
+		frappe.log_error("Xero Tracing", f"Failed to export trace {trace.trace_id}: {str(e)}")
@@ -5,6 +5,27 @@ import json
 
 import frappe
 from frappe import _
+from frappe.utils import add_to_date, cint, flt, now, now_datetime
+
+from .base import get_xero_client
+from .contact import refresh_contacts_from_xero
+from .payment_accounts import get_payment_accounts
+from .tracing import span, traced
+
+# Events claimed by an inbox job at a time
+INBOX_BATCH_SIZE = 50
+
+# Inbox jobs processing events side by side, unless set in Xero Settings
+DEFAULT_WEBHOOK_WORKERS = 2
+
+MAX_EVENT_ATTEMPTS = 5
+
+# Minutes before a failed event is retried, doubled on every further failure, so a
+# Xero outage or an exhausted rate limit is waited out instead of using up the attempts
+RETRY_BACKOFF_MINUTES = 5
+
+# Events left in Processing this long belong to an inbox job that died
+STALE_PROCESSING_MINUTES = 15
 
 
 @frappe.whitelist(allow_guest=True, methods=["GET", "POST"])
@@ -78,9 +99,10 @@ def handle_webhook_event():
 			# Fallback to getting json data from request
 			req_data = frappe.local.form_dict
 
+		# Store the events and acknowledge; background jobs process them
 		if req_data.get("events"):
-			for event in req_data["events"]:
-				process_webhook_event(event)
+			store_webhook_events(req_data["events"])
+			enqueue_webhook_inbox(settings.webhook_workers)
 
 		frappe.local.response.http_status_code = 200
 		return "OK"
@@ -91,146 +113,345 @@ def handle_webhook_event():
 		return "Internal Server Error"
 
 
-def process_webhook_event(event):
-	"""Process individual webhook event"""
-	try:
-		event_category = event.get("eventCategory")
-		event_type = event.get("eventType")
-		resource_id = event.get("resourceId")
-
-		# Only handle invoice events
-		if event_category == "INVOICE" and event_type == "UPDATE":
-			update_invoice_from_xero(resource_id)
-
-	except Exception as e:
-		frappe.log_error(f"Error processing webhook event: {str(e)}", "Xero Webhook Event Processing")
-
-
-def update_invoice_from_xero(invoice_id):
-	"""Update existing invoice from Xero - handle status changes like PAID/VOIDED"""
-	try:
-		from .base import get_xero_client
+def store_webhook_events(events):
+	"""
+	Append received events to the Xero Webhook Event inbox in one insert.
+
+	The event key (resourceId, eventDateUtc, eventType) is unique, so deliveries that
+	Xero retries are dropped by the insert instead of being processed twice.
+	"""
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		"Xero Webhook Event",
+		[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"event_key",
+			"event_category",
+			"event_type",
+			"resource_id",
+			"event_date_utc",
+			"tenant_id",
+			"status",
+			"attempts",
+			"payload",
+		],
+		[
+			[
+				frappe.generate_hash(length=10),
+				timestamp,
+				timestamp,
+				user,
+				user,
+				get_event_key(event),
+				event.get("eventCategory"),
+				event.get("eventType"),
+				event.get("resourceId"),
+				event.get("eventDateUtc"),
+				event.get("tenantId"),
+				"Queued",
+				0,
+				json.dumps(event),
+			]
+			for event in events
+		],
+		ignore_duplicates=True,
+	)
+
+
+def get_event_key(event):
+	return "|".join(str(event.get(key) or "") for key in ("resourceId", "eventDateUtc", "eventType"))
+
+
+def enqueue_webhook_inbox(workers=None):
+	"""Start up to `workers` inbox jobs; a job that is already queued or running is not duplicated"""
+	workers = cint(workers) or DEFAULT_WEBHOOK_WORKERS
+
+	for slot in range(workers):
+		frappe.enqueue(
+			"xero_erpnext_integration.xero_erpnext_integration.apis.webhook.process_webhook_inbox",
+			queue="short",
+			job_id=f"xero_webhook_inbox|{slot}|{workers}",
+			deduplicate=True,
+			enqueue_after_commit=True,
+			slot=slot,
+			workers=workers,
+		)
 
-		# Get invoice details from Xero
-		client = get_xero_client()
-		response = client.make_request("GET", f"/Invoices/{invoice_id}")
 
-		if not response or "Invoices" not in response:
-			frappe.log_error(f"Invoice {invoice_id} not found in Xero", "Xero Webhook")
+def process_webhook_inbox(slot=0, workers=1):
+	"""
+	Process queued webhook events until the inbox is empty.
+
+	Each inbox job owns the resources that hash to its slot, so events for one invoice
+	or contact are never processed by two jobs at the same time.
+	"""
+	while events := claim_webhook_events(INBOX_BATCH_SIZE, slot, workers):
+		process_webhook_batch(events)
+
+
+@traced("db.claim_webhook_events")
+def claim_webhook_events(limit, slot=0, workers=1):
+	"""Mark the oldest queued events of this slot as Processing"""
+	names = frappe.db.sql(
+		"""
+		select name from `tabXero Webhook Event`
+		where status = 'Queued' and crc32(ifnull(resource_id, '')) %% %(workers)s = %(slot)s
+			and (next_attempt_at is null or next_attempt_at <= %(now)s)
+		order by creation
+		limit %(limit)s
+		for update skip locked
+		""",
+		{"limit": limit, "slot": slot, "workers": workers, "now": now_datetime()},
+		pluck=True,
+	)
+	if not names:
+		frappe.db.commit()
+		return []
+
+	frappe.db.set_value("Xero Webhook Event", {"name": ["in", names]}, "status", "Processing")
+	frappe.db.commit()
+
+	return frappe.get_all(
+		"Xero Webhook Event",
+		filters={"name": ["in", names]},
+		fields=["name", "event_category", "event_type", "resource_id", "event_date_utc", "attempts"],
+		order_by="creation",
+	)
+
+
+@traced("webhook.batch")
+def process_webhook_batch(events):
+	"""
+	Process a batch of inbox events.
+
+	Events are coalesced to the latest one per resource, since each handler reads the
+	current state from Xero. The touched invoices and contacts are then fetched with one
+	IDs query per resource type.
+	"""
+	events_by_resource = {}
+	for event in events:
+		events_by_resource.setdefault((event.event_category, event.resource_id), []).append(event)
+
+	invoice_ids = []
+	contact_ids = []
+	for (category, resource_id), resource_events in events_by_resource.items():
+		latest = max(resource_events, key=lambda event: event.event_date_utc or "")
+		if category == "INVOICE" and latest.event_type == "UPDATE":
+			invoice_ids.append(resource_id)
+		elif category == "CONTACT":
+			contact_ids.append(resource_id)
+		else:
+			# Nothing to do for other events
+			record_outcome(resource_events)
+
+	if contact_ids:
+		contact_events = [
+			event for resource_id in contact_ids for event in events_by_resource[("CONTACT", resource_id)]
+		]
+		run_for_events(contact_events, refresh_contacts_from_xero, contact_ids)
+
+	if invoice_ids:
+		try:
+			xero_invoices = {
+				invoice["InvoiceID"]: invoice
+				for invoice in get_xero_client().get_paged("Invoices", "Invoices", ids=invoice_ids)
+			}
+			sales_invoices = get_sales_invoices_by_xero_id(invoice_ids)
+		except Exception:
+			invoice_events = [
+				event for resource_id in invoice_ids for event in events_by_resource[("INVOICE", resource_id)]
+			]
+			record_outcome(invoice_events, frappe.get_traceback())
 			return
 
-		xero_invoice = response["Invoices"][0]
-		status = xero_invoice.get("Status")
-		amount_paid = float(xero_invoice.get("AmountPaid", 0))
+		for invoice_id in invoice_ids:
+			run_for_events(
+				events_by_resource[("INVOICE", invoice_id)],
+				apply_xero_invoice_update,
+				invoice_id,
+				xero_invoices.get(invoice_id),
+				sales_invoices.get(invoice_id),
+			)
+
 
-		# Find corresponding ERPNext Sales Invoice
-		sales_invoice = frappe.get_all(
+def run_for_events(events, handler, *args):
+	"""Run a handler for the events of a resource and record the outcome on all of them"""
+	try:
+		handler(*args)
+		record_outcome(events)
+	except Exception:
+		frappe.db.rollback()
+		record_outcome(events, frappe.get_traceback())
+
+
+@traced("db.record_outcome")
+def record_outcome(events, error=None):
+	"""Mark events Processed, or requeue them with the error and a backoff until MAX_EVENT_ATTEMPTS"""
+	for event in events:
+		values = {"status": "Processed", "error": None, "next_attempt_at": None}
+		if error:
+			attempts = cint(event.attempts) + 1
+			values = {
+				"status": "Failed" if attempts >= MAX_EVENT_ATTEMPTS else "Queued",
+				"attempts": attempts,
+				"error": error,
+				"next_attempt_at": add_to_date(
+					now_datetime(), minutes=RETRY_BACKOFF_MINUTES * 2 ** (attempts - 1)
+				),
+			}
+		frappe.db.set_value("Xero Webhook Event", event.name, values)
+
+	frappe.db.commit()
+
+
+def requeue_webhook_inbox():
+	"""
+	Scheduled safety net: release events of dead inbox jobs, and restart the jobs when
+	queued events are due, including failed ones whose backoff has passed
+	"""
+	frappe.db.set_value(
+		"Xero Webhook Event",
+		{
+			"status": "Processing",
+			"modified": ["<", add_to_date(now_datetime(), minutes=-STALE_PROCESSING_MINUTES)],
+		},
+		"status",
+		"Queued",
+	)
+
+	if frappe.get_all(
+		"Xero Webhook Event",
+		filters={"status": "Queued"},
+		or_filters=[["next_attempt_at", "is", "not set"], ["next_attempt_at", "<=", now_datetime()]],
+		limit=1,
+	):
+		enqueue_webhook_inbox(frappe.db.get_single_value("Xero Settings", "webhook_workers"))
+
+
+@traced("db.sales_invoices_by_xero_id")
+def get_sales_invoices_by_xero_id(invoice_ids):
+	"""Find the ERPNext Sales Invoices of many Xero invoices in one query"""
+	return {
+		row.custom_xero_invoice_number: row
+		for row in frappe.get_all(
 			"Sales Invoice",
-			filters={"custom_xero_invoice_number": invoice_id},
-			fields=["name", "customer", "grand_total", "docstatus"],
-			limit=1,
+			filters={"custom_xero_invoice_number": ["in", invoice_ids]},
+			fields=["name", "customer", "grand_total", "docstatus", "custom_xero_invoice_number"],
 		)
+	}
 
-		if not sales_invoice:
-			frappe.log_error(f"No ERPNext invoice found for Xero invoice {invoice_id}", "Xero Webhook")
-			return
 
-		sales_invoice = sales_invoice[0]
+@traced("webhook.invoice_update")
+def apply_xero_invoice_update(invoice_id, xero_invoice, sales_invoice):
+	"""Update existing invoice from Xero - handle status changes like PAID/VOIDED"""
+	if not xero_invoice:
+		frappe.log_error(f"Invoice {invoice_id} not found in Xero", "Xero Webhook")
+		return
 
-		# Handle PAID status - create payment entry
-		if status == "PAID" and amount_paid > 0:
-			handle_paid_invoice(sales_invoice, xero_invoice, amount_paid)
+	if not sales_invoice:
+		frappe.log_error(f"No ERPNext invoice found for Xero invoice {invoice_id}", "Xero Webhook")
+		return
 
-		# Handle VOIDED status - cancel invoice in ERPNext
-		elif status == "VOIDED":
-			handle_voided_invoice(sales_invoice, invoice_id)
+	status = xero_invoice.get("Status")
+	amount_paid = float(xero_invoice.get("AmountPaid", 0))
 
-		frappe.log_error(f"Successfully processed {status} invoice {invoice_id}", "Xero Webhook")
+	# Handle PAID status - create payment entry
+	if status == "PAID" and amount_paid > 0:
+		handle_paid_invoice(sales_invoice, xero_invoice, amount_paid)
 
-	except Exception as e:
-		frappe.log_error(f"Error updating invoice {invoice_id} from Xero: {str(e)}", "Xero Webhook")
+	# Handle VOIDED status - cancel invoice in ERPNext
+	elif status == "VOIDED":
+		handle_voided_invoice(sales_invoice, xero_invoice)
 
 
 def handle_paid_invoice(sales_invoice, xero_invoice, amount_paid):
-	"""Handle when an invoice is marked as PAID in Xero"""
-	try:
-		# Get the Sales Invoice document
+	"""
+	Handle when an invoice is marked as PAID in Xero.
+
+	Errors propagate so the inbox records them and retries the event. Redelivered events
+	create nothing: a Xero payment is recorded once, and only the amount not yet
+	allocated to the invoice is paid.
+	"""
+	xero_invoice_id = xero_invoice.get("InvoiceID")
+	payment_id = get_latest_payment_id(xero_invoice)
+	if payment_id and frappe.db.exists(
+		"Payment Entry", {"custom_xero_payment_id": payment_id, "docstatus": 1}
+	):
+		return
+
+	remaining_amount = flt(amount_paid) - get_allocated_amount(sales_invoice["name"])
+	if remaining_amount <= 0:
+		return
+
+	# Get the Sales Invoice document
+	with span("db.get_doc"):
 		sales_invoice_doc = frappe.get_doc("Sales Invoice", sales_invoice["name"])
 
-		# Update custom xero invoice number
-		xero_invoice_id = xero_invoice.get("InvoiceID")
-		if xero_invoice_id:
-			sales_invoice_doc.custom_xero_invoice_number = xero_invoice_id
-			sales_invoice_doc.save()
-
-		# Create payment entry
-		frappe.log_error(
-			f"Starting to create payment entry for invoice: {sales_invoice['name']}", "Xero Webhook"
-		)
-
-		try:
-			payment_entry = frappe.new_doc("Payment Entry")
-			payment_entry.payment_type = "Receive"
-			payment_entry.party_type = "Customer"
-			payment_entry.party = sales_invoice_doc.customer
-			payment_entry.paid_amount = amount_paid
-			payment_entry.received_amount = amount_paid
-			payment_entry.paid_from = frappe.get_value(
-				"Company", sales_invoice_doc.company, "default_receivable_account"
-			)
-			payment_entry.paid_to = frappe.get_value(
-				"Company", sales_invoice_doc.company, "default_cash_account"
-			)
-			payment_entry.reference_no = f"Xero-{xero_invoice_id}"
-			payment_entry.reference_date = frappe.utils.today()
-
-			frappe.log_error(
-				f"Created payment entry with amount {amount_paid} for customer {sales_invoice_doc.customer}",
-				"Xero Webhook",
-			)
-
-			# Add reference to sales invoice
-			payment_entry.append(
-				"references",
-				{
-					"reference_doctype": "Sales Invoice",
-					"reference_name": sales_invoice_doc.name,
-					"allocated_amount": amount_paid,
-				},
-			)
-
-			frappe.log_error("Xero Webhook", f"Added reference to sales invoice {sales_invoice_doc.name}")
-
-			payment_entry.insert()
-			frappe.log_error("Xero Webhook", f"Inserted payment entry {payment_entry.name}")
-
-			payment_entry.submit()
-			frappe.log_error("Xero Webhook", f"Submitted payment entry {payment_entry.name}")
-
-			frappe.log_error(
-				"Xero Webhook Success",
-				f"Successfully created payment entry {payment_entry.name} for invoice {sales_invoice['name']}",
-			)
-
-		except Exception as payment_error:
-			frappe.log_error(
-				"Xero Webhook Payment Error",
-				f"Failed to create payment entry for invoice {sales_invoice['name']}: {str(payment_error)}",
-			)
-
-	except Exception as e:
-		frappe.log_error(
-			"Xero Webhook Error", f"Error handling paid invoice {sales_invoice['name']}: {str(e)}"
-		)
-
-
-def handle_voided_invoice(sales_invoice, xero_invoice_id):
-	"""Handle when an invoice is VOIDED in Xero"""
-	try:
-		from ..schedulers.voided_invoice_sync import sync_voided_invoices
-
-		# Sync voided invoices from Xero
-		sync_voided_invoices()
-
-	except Exception as e:
-		frappe.log_error(f"Error handling voided invoice {sales_invoice['name']}: {str(e)}", "Xero Webhook")
+	payment_entry = frappe.new_doc("Payment Entry")
+	payment_entry.payment_type = "Receive"
+	payment_entry.party_type = "Customer"
+	payment_entry.party = sales_invoice_doc.customer
+	payment_entry.paid_amount = remaining_amount
+	payment_entry.received_amount = remaining_amount
+	accounts = get_payment_accounts(sales_invoice_doc.company, sales_invoice_doc.customer)
+	payment_entry.paid_from = accounts.paid_from
+	payment_entry.paid_to = accounts.paid_to
+	payment_entry.reference_no = f"Xero-{xero_invoice_id}"
+	payment_entry.reference_date = frappe.utils.today()
+
+	# Mark it as Xero's own payment so it is never pushed back as a new one
+	payment_entry.custom_from_xero = 1
+	payment_entry.custom_xero_payment_id = payment_id
+
+	# Add reference to sales invoice
+	payment_entry.append(
+		"references",
+		{
+			"reference_doctype": "Sales Invoice",
+			"reference_name": sales_invoice_doc.name,
+			"allocated_amount": remaining_amount,
+		},
+	)
+
+	with span("payment_entry.insert"):
+		payment_entry.insert()
+	with span("payment_entry.submit"):
+		payment_entry.submit()
+
+
+@traced("db.allocated_amount")
+def get_allocated_amount(sales_invoice):
+	"""Amount of submitted Payment Entries already allocated to a Sales Invoice"""
+	allocated = frappe.get_all(
+		"Payment Entry Reference",
+		filters={
+			"parenttype": "Payment Entry",
+			"reference_doctype": "Sales Invoice",
+			"reference_name": sales_invoice,
+			"docstatus": 1,
+		},
+		fields=["sum(allocated_amount) as allocated_amount"],
+	)
+	return flt(allocated[0].allocated_amount) if allocated else 0
+
+
+def get_latest_payment_id(xero_invoice):
+	"""PaymentID of the most recent payment embedded in a Xero invoice"""
+	payments = xero_invoice.get("Payments") or []
+	if not payments:
+		return None
+
+	latest = max(payments, key=lambda payment: payment.get("UpdatedDateUTC", "") or payment.get("Date", ""))
+	return latest.get("PaymentID")
+
+
+def handle_voided_invoice(sales_invoice, xero_invoice):
+	"""Handle when an invoice is VOIDED in Xero: cancel exactly this Sales Invoice"""
+	from ..schedulers.voided_invoice_sync import cancel_invoice_in_erpnext
+
+	cancel_invoice_in_erpnext(sales_invoice, xero_invoice, "webhook")
@@ -15,7 +15,10 @@ def send_contact_to_xero(doc_name):
 	if not doc.get("custom_contact_id"):
 		try:
 			# Call the Xero API to create contact
-			from xero_erpnext_integration.xero_erpnext_integration.apis.contact import create_contact
+			from xero_erpnext_integration.xero_erpnext_integration.apis.contact import (
+				create_contact,
+				invalidate_customer_contact_ids,
+			)
 
 			result = create_contact(doc.name)
 
@@ -25,6 +28,7 @@ def send_contact_to_xero(doc_name):
 
 				# Reload the document to reflect the changes
 				doc.reload()
+				invalidate_customer_contact_ids(doc)
 
 				frappe.msgprint(
 					_("Contact created successfully in Xero"), title=_("Success"), indicator="green"
@@ -0,0 +1,34 @@
+frappe.listview_settings["Contact"] = frappe.listview_settings["Contact"] || {};
+
+const xero_contact_onload = frappe.listview_settings["Contact"].onload;
+
+frappe.listview_settings["Contact"].onload = function (listview) {
+	if (xero_contact_onload) {
+		xero_contact_onload(listview);
+	}
+
+	listview.page.add_actions_menu_item(__("Sync to Xero"), function () {
+		// Sync the selected contacts, or every contact matching the current filters
+		const contact_names = listview.get_checked_items(true);
+		const filters = contact_names.length
+			? [["Contact", "name", "in", contact_names]]
+			: listview.get_filters_for_args();
+
+		frappe.call({
+			method: "xero_erpnext_integration.xero_erpnext_integration.apis.contact.push_contacts_to_xero",
+			args: {
+				filters: filters,
+			},
+			callback: function (r) {
+				if (r.message && r.message.status === "success") {
+					frappe.show_alert({ message: r.message.message, indicator: "green" });
+				} else {
+					frappe.show_alert({
+						message: __("Failed to queue contacts for sync to Xero"),
+						indicator: "red",
+					});
+				}
+			},
+		});
+	});
+};
@@ -23,7 +23,7 @@ function send_payment_to_xero(frm) {
 						message: r.message.message,
 						indicator: "green",
 					});
-					frm.set_value("custom_xero_payment_id", r.message.data.PaymentID);
+					frm.set_value("custom_xero_payment_id", r.message.payment_id);
 					frm.set_df_property("custom_xero_payment_id", "read_only", 1);
 					// frm.save()
 				} else {
@@ -0,0 +1,37 @@
+frappe.listview_settings["Sales Invoice"] = frappe.listview_settings["Sales Invoice"] || {};
+
+const xero_sales_invoice_onload = frappe.listview_settings["Sales Invoice"].onload;
+
+frappe.listview_settings["Sales Invoice"].onload = function (listview) {
+	if (xero_sales_invoice_onload) {
+		xero_sales_invoice_onload(listview);
+	}
+
+	listview.page.add_actions_menu_item(__("Sync to Xero"), function () {
+		const invoice_names = listview.get_checked_items(true);
+		if (!invoice_names.length) {
+			frappe.show_alert({
+				message: __("Please select the invoices to sync to Xero"),
+				indicator: "orange",
+			});
+			return;
+		}
+
+		frappe.call({
+			method: "xero_erpnext_integration.xero_erpnext_integration.apis.sales_invoice.push_invoices_to_xero",
+			args: {
+				invoice_names: invoice_names,
+			},
+			callback: function (r) {
+				if (r.message && r.message.status === "success") {
+					frappe.show_alert({ message: r.message.message, indicator: "green" });
+				} else {
+					frappe.show_alert({
+						message: __("Failed to queue invoices for sync to Xero"),
+						indicator: "red",
+					});
+				}
+			},
+		});
+	});
+};
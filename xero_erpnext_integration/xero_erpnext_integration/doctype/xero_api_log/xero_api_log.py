@@ -1,9 +1,20 @@
 # Copyright (c) 2025, nasirucode and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class XeroAPILog(Document):
-	pass
+	def onload(self):
+		# Compressed bodies are only inflated when the log is opened
+		from ...apis.api_log import read_api_log_body
+
+		for field in ("payload", "response"):
+			if self.get(f"{field}_body") and not self.get(field):
+				self.set(field, read_api_log_body(self.get(f"{field}_body")))
+
+
+def on_doctype_update():
+	# api_url is a text column, so it can only be indexed on a prefix
+	frappe.db.add_index("Xero API Log", ["api_url(140)"], index_name="api_url_index")
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, nasirucode and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Xero Contact Match", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,22 @@
+# Copyright (c) 2026, nasirucode and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class XeroContactMatch(Document):
+	def on_update(self):
+		# Approving a candidate links the Contact and closes its other candidates
+		if self.status != "Approved" or not self.has_value_changed("status"):
+			return
+
+		contact = frappe.get_doc("Contact", self.contact)
+		contact.custom_contact_id = self.xero_contact
+		contact.save()
+		frappe.db.set_value(
+			"Xero Contact Match",
+			{"contact": self.contact, "status": "Open", "name": ["!=", self.name]},
+			"status",
+			"Rejected",
+		)
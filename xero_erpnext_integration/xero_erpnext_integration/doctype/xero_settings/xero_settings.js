@@ -22,6 +22,7 @@ frappe.ui.form.on("Xero Settings", {
 		// Show connection status
 		if (frm.doc.access_token) {
 			frm.dashboard.add_indicator(__("Connected"), "green");
+			show_api_metrics(frm);
 		} else {
 			frm.dashboard.add_indicator(__("Not Connected"), "red");
 		}
@@ -194,3 +195,47 @@ function authorize(frm) {
 		indicator: "blue",
 	});
 }
+
+function show_api_metrics(frm) {
+	frappe.call({
+		method: "xero_erpnext_integration.xero_erpnext_integration.apis.metrics.get_metrics_summary",
+		callback: function (r) {
+			if (!r.message || !r.message.endpoints.length) {
+				return;
+			}
+
+			const remaining = Object.entries(r.message.remaining)
+				.map(([window, value]) => `${frappe.utils.escape_html(window)}: ${value}`)
+				.join(", ");
+			const rows = r.message.endpoints
+				.slice(0, 10)
+				.map(
+					(row) => `<tr>
+						<td>${frappe.utils.escape_html(row.endpoint)}</td>
+						<td>${row.requests}</td>
+						<td>${row.error_rate}%</td>
+						<td>${row.rate_limited}</td>
+						<td>${row.retries}</td>
+						<td>${row.avg_ms}</td>
+					</tr>`
+				)
+				.join("");
+
+			frm.dashboard.add_section(
+				`<p class="text-muted">${__("Calls remaining")}: ${remaining || __("not reported yet")}</p>
+				<table class="table table-bordered table-condensed">
+					<thead><tr>
+						<th>${__("Endpoint")}</th>
+						<th>${__("Requests")}</th>
+						<th>${__("Errors")}</th>
+						<th>${__("429s")}</th>
+						<th>${__("Retries")}</th>
+						<th>${__("Avg ms")}</th>
+					</tr></thead>
+					<tbody>${rows}</tbody>
+				</table>`,
+				__("API Metrics")
+			);
+		},
+	});
+}
@@ -6,4 +6,10 @@ from frappe.model.document import Document
 
 
 class XeroSettings(Document):
-	pass
+	def on_update(self):
+		from xero_erpnext_integration.xero_erpnext_integration.apis.base import reset_xero_client
+
+		# Rebuild the cached API clients of every worker with the new settings. Tokens are only
+		# dropped on a new authorization, a form saved with stale token values must not win over
+		# the rotated tokens held in the cache.
+		reset_xero_client(clear_token=self.has_value_changed("code"))
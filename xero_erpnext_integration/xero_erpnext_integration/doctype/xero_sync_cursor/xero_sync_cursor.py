@@ -0,0 +1,76 @@
+# Copyright (c) 2026, nasirucode and contributors
+# For license information, please see license.txt
+
+import json
+from datetime import timedelta
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+# Overlap between sync windows, to allow for clock skew with Xero
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Runs a failed record is fetched again for before it is given up and logged
+MAX_RETRY_ATTEMPTS = 12
+
+
+class XeroSyncCursor(Document):
+	pass
+
+
+def get_watermark(entity, tenant_id):
+	"""Get the watermark of an entity, None before its first successful sync"""
+	return frappe.db.get_value("Xero Sync Cursor", {"entity": entity, "tenant_id": tenant_id}, "watermark")
+
+
+def get_retry_ids(entity, tenant_id):
+	"""Get the Xero IDs that failed in earlier syncs of an entity, with their attempts so far"""
+	retry_ids = frappe.db.get_value(
+		"Xero Sync Cursor", {"entity": entity, "tenant_id": tenant_id}, "retry_ids"
+	)
+	return frappe.parse_json(retry_ids) or {}
+
+
+def next_retry_ids(entity, previous, failed_ids):
+	"""
+	Count another attempt for the records that failed in this run. Records that synced,
+	or failed MAX_RETRY_ATTEMPTS times, leave the list; the latter are logged.
+	"""
+	retry_ids = {}
+	given_up = []
+	for record_id in failed_ids:
+		attempts = cint(previous.get(record_id)) + 1
+		if attempts < MAX_RETRY_ATTEMPTS:
+			retry_ids[record_id] = attempts
+		else:
+			given_up.append(record_id)
+
+	if given_up:
+		frappe.log_error(
+			title=f"Xero {entity} Sync",
+			message=f"Stopped retrying after {MAX_RETRY_ATTEMPTS} failed syncs: {', '.join(given_up)}",
+		)
+
+	return retry_ids
+
+
+def set_watermark(entity, tenant_id, watermark, retry_ids=None):
+	"""Move the watermark of an entity forward after a successful sync, with the IDs to retry"""
+	values = {"watermark": watermark, "last_run": now_datetime()}
+	if retry_ids is not None:
+		values["retry_ids"] = json.dumps(retry_ids)
+
+	name = frappe.db.get_value("Xero Sync Cursor", {"entity": entity, "tenant_id": tenant_id})
+	if name:
+		frappe.db.set_value("Xero Sync Cursor", name, values)
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": "Xero Sync Cursor",
+			"entity": entity,
+			"tenant_id": tenant_id,
+			**values,
+		}
+	).insert(ignore_permissions=True)
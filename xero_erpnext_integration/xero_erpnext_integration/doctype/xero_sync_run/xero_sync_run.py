@@ -0,0 +1,128 @@
+# Copyright (c) 2026, nasirucode and contributors
+# For license information, please see license.txt
+
+import threading
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+from frappe.utils import flt, now_datetime
+
+from ...apis.tracing import span
+
+SYNC_RUN_COUNTERS = ("scanned", "matched", "created", "skipped", "api_calls", "bytes_transferred")
+
+
+class XeroSyncRun(Document):
+	@staticmethod
+	def clear_old_logs(days=90):
+		"""Delete runs older than the given number of days, for Log Settings"""
+		table = frappe.qb.DocType("Xero Sync Run")
+		frappe.db.delete(table, filters=(table.modified < (Now() - Interval(days=days))))
+
+
+class SyncRunStats:
+	"""Counters of one sync run; shared with the worker threads of its paged fetches"""
+
+	def __init__(self, job, full=False):
+		self.job = job
+		self.full = full
+		self.tenant_id = None
+		self.watermark = None
+		self.started_at = now_datetime()
+		self.started = time.monotonic()
+		self.counts = dict.fromkeys(SYNC_RUN_COUNTERS, 0)
+		self.api_time = 0.0
+		self.api_intervals = []
+		self._lock = threading.Lock()
+
+	def add(self, **counts):
+		with self._lock:
+			for counter, value in counts.items():
+				self.counts[counter] += value
+
+	def add_api_call(self, seconds, size):
+		with self._lock:
+			self.counts["api_calls"] += 1
+			self.counts["bytes_transferred"] += size
+			self.api_time += seconds
+			finished = time.monotonic()
+			self.api_intervals.append((finished - seconds, finished))
+
+	def api_wall_time(self):
+		"""Wall time with at least one Xero call in flight, counting parallel calls once"""
+		total = 0.0
+		start = end = None
+		for call_start, call_end in sorted(self.api_intervals):
+			if end is None or call_start > end:
+				if end is not None:
+					total += end - start
+				start, end = call_start, call_end
+			else:
+				end = max(end, call_end)
+		if end is not None:
+			total += end - start
+		return total
+
+	def save(self, status, error=None):
+		duration = time.monotonic() - self.started
+		frappe.get_doc(
+			{
+				"doctype": "Xero Sync Run",
+				"job": self.job,
+				"status": status,
+				"full_sync": 1 if self.full else 0,
+				"tenant_id": self.tenant_id,
+				"started_at": self.started_at,
+				"finished_at": now_datetime(),
+				"duration": flt(duration, 3),
+				"watermark": self.watermark,
+				**self.counts,
+				"api_time": flt(self.api_time, 3),
+				"other_time": flt(max(0, duration - self.api_wall_time()), 3),
+				"error": error,
+			}
+		).insert(ignore_permissions=True)
+
+
+@contextmanager
+def sync_run(job, full=False):
+	"""
+	Record one execution of a sync job as a Xero Sync Run.
+
+	Xero API calls made inside the block are counted through frappe.local.xero_sync_run;
+	the job adds its item counts, tenant and final watermark to the yielded stats.
+	The block also runs in a tracing span, the root of the run's trace.
+	"""
+	run = SyncRunStats(job, full)
+	frappe.local.xero_sync_run = run
+	status, error = "Success", None
+
+	try:
+		# The run is the root span of a trace, when tracing samples it
+		with span(f"sync_run {job}", **{"xero.full_sync": bool(full)}):
+			yield run
+	except Exception as e:
+		status, error = "Failed", str(e)
+		raise
+	finally:
+		frappe.local.xero_sync_run = None
+		try:
+			run.save(status, error)
+		except Exception as e:
+			frappe.log_error("Xero Sync Run", f"Failed to record {job} run: {str(e)}")
+
+
+def count_sync_run_call(response, seconds):
+	"""Add an API call to the sync run in progress, if any"""
+	run = getattr(frappe.local, "xero_sync_run", None)
+	if run is None:
+		return
+
+	size = 0
+	if response is not None:
+		size = len(response.content or b"") + len(response.request.body or b"")
+	run.add_api_call(seconds, size)
@@ -0,0 +1,18 @@
+# Copyright (c) 2026, nasirucode and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class XeroWebhookEvent(Document):
+	@staticmethod
+	def clear_old_logs(days=7):
+		"""Delete processed events older than the given number of days, for Log Settings"""
+		table = frappe.qb.DocType("Xero Webhook Event")
+		frappe.db.delete(
+			table,
+			filters=(table.modified < (Now() - Interval(days=days))) & (table.status == "Processed"),
+		)
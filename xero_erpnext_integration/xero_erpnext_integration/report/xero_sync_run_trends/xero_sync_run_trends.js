@@ -0,0 +1,27 @@
+// Copyright (c) 2026, nasirucode and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Xero Sync Run Trends"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -30),
+			reqd: 1,
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+			reqd: 1,
+		},
+		{
+			fieldname: "job",
+			label: __("Job"),
+			fieldtype: "Select",
+			options: ["", "Invoice Payments", "Voided Invoices"],
+		},
+	],
+};
@@ -0,0 +1,108 @@
+# Copyright (c) 2026, nasirucode and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, getdate, today
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	data = get_data(filters)
+	return get_columns(), data, None, get_chart(data)
+
+
+def get_columns():
+	return [
+		{"label": _("Date"), "fieldname": "date", "fieldtype": "Date", "width": 100},
+		{"label": _("Job"), "fieldname": "job", "fieldtype": "Data", "width": 140},
+		{"label": _("Runs"), "fieldname": "runs", "fieldtype": "Int", "width": 70},
+		{"label": _("Failed"), "fieldname": "failed", "fieldtype": "Int", "width": 70},
+		{"label": _("Scanned"), "fieldname": "scanned", "fieldtype": "Int", "width": 90},
+		{"label": _("Matched"), "fieldname": "matched", "fieldtype": "Int", "width": 90},
+		{"label": _("Created"), "fieldname": "created", "fieldtype": "Int", "width": 90},
+		{"label": _("Skipped"), "fieldname": "skipped", "fieldtype": "Int", "width": 90},
+		{"label": _("API Calls"), "fieldname": "api_calls", "fieldtype": "Int", "width": 90},
+		{"label": _("MB Transferred"), "fieldname": "megabytes", "fieldtype": "Float", "width": 120},
+		{"label": _("Avg Duration (s)"), "fieldname": "avg_duration", "fieldtype": "Float", "width": 120},
+		{"label": _("Max Duration (s)"), "fieldname": "max_duration", "fieldtype": "Float", "width": 120},
+		{"label": _("API Time (s)"), "fieldname": "api_time", "fieldtype": "Float", "width": 110},
+		{"label": _("Other Time (s)"), "fieldname": "other_time", "fieldtype": "Float", "width": 110},
+		{"label": _("Items per Second"), "fieldname": "throughput", "fieldtype": "Float", "width": 120},
+	]
+
+
+def get_data(filters):
+	run = frappe.qb.DocType("Xero Sync Run")
+	from_date = getdate(filters.from_date or add_days(today(), -30))
+	to_date = getdate(filters.to_date or today())
+
+	query = (
+		frappe.qb.from_(run)
+		.select(run.started_at, run.job, run.status, run.duration, run.api_time, run.other_time, run.scanned)
+		.select(run.matched, run.created, run.skipped, run.api_calls, run.bytes_transferred)
+		.where(run.started_at >= from_date)
+		.where(run.started_at < add_days(to_date, 1))
+		.orderby(run.started_at)
+	)
+	if filters.job:
+		query = query.where(run.job == filters.job)
+
+	rows = {}
+	for entry in query.run(as_dict=True):
+		row = rows.setdefault(
+			(getdate(entry.started_at), entry.job),
+			frappe._dict(
+				date=getdate(entry.started_at),
+				job=entry.job,
+				runs=0,
+				failed=0,
+				scanned=0,
+				matched=0,
+				created=0,
+				skipped=0,
+				api_calls=0,
+				megabytes=0,
+				duration=0,
+				max_duration=0,
+				api_time=0,
+				other_time=0,
+			),
+		)
+		row.runs += 1
+		row.failed += 1 if entry.status == "Failed" else 0
+		for counter in ("scanned", "matched", "created", "skipped", "api_calls", "api_time", "other_time"):
+			row[counter] += flt(entry[counter])
+		row.megabytes += flt(entry.bytes_transferred) / 1048576
+		row.duration += flt(entry.duration)
+		row.max_duration = max(row.max_duration, flt(entry.duration))
+
+	for row in rows.values():
+		row.avg_duration = flt(row.duration / row.runs, 3)
+		row.throughput = flt(row.scanned / row.duration, 2) if row.duration else 0
+
+	return list(rows.values())
+
+
+def get_chart(data):
+	dates = sorted({row.date for row in data})
+	if not dates:
+		return None
+
+	durations = {}
+	api_calls = {}
+	for row in data:
+		durations[row.date] = max(durations.get(row.date, 0), row.avg_duration)
+		api_calls[row.date] = api_calls.get(row.date, 0) + row.api_calls
+
+	return {
+		"data": {
+			"labels": [frappe.format(date, "Date") for date in dates],
+			"datasets": [
+				{"name": _("Slowest Avg Duration (s)"), "values": [durations[date] for date in dates]},
+				{"name": _("API Calls"), "values": [api_calls[date] for date in dates]},
+			],
+		},
+		"type": "line",
+		"axisOptions": {"xIsSeries": 1},
+	}
@@ -1,116 +1,151 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 import frappe
-from frappe.utils import get_datetime, getdate
-
-
-def sync_voided_invoices():
-	"""Check for voided invoices from Xero today and cancel them in ERPNext"""
+from frappe.utils import cint
+
+from ..apis.tracing import span, traced
+from ..doctype.xero_sync_cursor.xero_sync_cursor import (
+	WATERMARK_OVERLAP,
+	get_retry_ids,
+	get_watermark,
+	next_retry_ids,
+	set_watermark,
+)
+from ..doctype.xero_sync_run.xero_sync_run import sync_run
+
+# How far back the first run looks for voided invoices
+INITIAL_LOOKBACK = timedelta(days=1)
+
+
+def sync_voided_invoices(full=False):
+	"""
+	Safety net for VOIDED webhook events: cancel ERPNext invoices voided in Xero.
+
+	Only invoices modified in Xero since the last run are fetched; pass full=1 to
+	re-check every voided invoice. Invoices already cancelled are skipped; the ones that
+	could not be cancelled are fetched again by ID on the next runs, up to MAX_RETRY_ATTEMPTS.
+	"""
 	try:
-		from ..apis.base import get_xero_client
-
-		# Get Xero client
-		client = get_xero_client()
-		if not client:
-			frappe.log_error("Xero client not available", "Voided Invoice Sync")
-			return
-
-		# Get today's date for filtering
-		today = getdate()
-
-		# Fetch voided invoices from Xero for today
-		where_clause = f'Status=="VOIDED" AND Date >= DateTime({today.year}, {today.month}, {today.day})'
-		response = client.make_request("GET", f"/Invoices?where={where_clause}")
-
-		if not response or "Invoices" not in response:
-			frappe.log_error("No response from Xero for voided invoices", "Voided Invoice Sync")
-			return
-
-		voided_invoices = response["Invoices"]
-		frappe.log_error(
-			f"Found {len(voided_invoices)} voided invoices in Xero for today", "Voided Invoice Sync"
-		)
-
-		for xero_invoice in voided_invoices:
-			process_voided_invoice(xero_invoice)
+		from ..apis.base import get_xero_client, if_modified_since
+
+		with sync_run("Voided Invoices", full) as run:
+			# Get Xero client
+			client = get_xero_client()
+			if not client:
+				raise Exception("Xero client not available")
+			run.tenant_id = client.tenant_id
+
+			started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+			watermark = None
+			if not cint(full):
+				watermark = get_watermark("VoidedInvoices", client.tenant_id) or started_at - INITIAL_LOOKBACK
+
+			voided_invoices = {
+				invoice.get("InvoiceID"): invoice
+				for invoice in client.get_paged(
+					"Invoices",
+					"Invoices",
+					params={"Statuses": "VOIDED"},
+					headers=if_modified_since(watermark),
+				)
+			}
+
+			# Invoices that failed to cancel in earlier runs
+			retry_ids = get_retry_ids("VoidedInvoices", client.tenant_id)
+			missing_ids = [invoice_id for invoice_id in retry_ids if invoice_id not in voided_invoices]
+			for invoice in client.get_paged("Invoices", "Invoices", ids=missing_ids):
+				if invoice.get("Status") == "VOIDED":
+					voided_invoices[invoice.get("InvoiceID")] = invoice
+
+			voided_invoices = list(voided_invoices.values())
+			run.add(scanned=len(voided_invoices))
+
+			sales_invoices = get_sales_invoices_for(voided_invoices)
+			failed_ids = []
+			for xero_invoice in voided_invoices:
+				sales_invoice = sales_invoices.get(xero_invoice.get("InvoiceID")) or sales_invoices.get(
+					xero_invoice.get("InvoiceNumber")
+				)
+				if not sales_invoice:
+					continue
+				run.add(matched=1)
+
+				try:
+					if cancel_invoice_in_erpnext(sales_invoice, xero_invoice, "scheduler"):
+						run.add(created=1)
+					else:
+						run.add(skipped=1)
+					frappe.db.commit()
+				except Exception as e:
+					frappe.db.rollback()
+					run.add(skipped=1)
+					failed_ids.append(xero_invoice.get("InvoiceID"))
+					frappe.log_error(
+						f"Error cancelling invoice {sales_invoice['name']}: {str(e)}", "Voided Invoice Sync"
+					)
+
+			run.watermark = started_at - WATERMARK_OVERLAP
+			set_watermark(
+				"VoidedInvoices",
+				client.tenant_id,
+				run.watermark,
+				next_retry_ids("VoidedInvoices", retry_ids, failed_ids),
+			)
 
 	except Exception as e:
 		frappe.log_error(f"Error in voided invoice sync: {str(e)}", "Voided Invoice Sync")
 
 
-def process_voided_invoice(xero_invoice):
-	"""Process a single voided invoice from Xero"""
-	try:
-		invoice_id = xero_invoice.get("InvoiceID")
-		invoice_number = xero_invoice.get("InvoiceNumber")
+@traced("db.voided_sales_invoices")
+def get_sales_invoices_for(xero_invoices):
+	"""Find the not yet cancelled Sales Invoices of Xero invoices, by Xero invoice ID or number"""
+	keys = {invoice.get(key) for invoice in xero_invoices for key in ("InvoiceID", "InvoiceNumber")}
+	keys.discard(None)
+	if not keys:
+		return {}
 
-		# Find corresponding ERPNext Sales Invoice by Xero invoice ID
-		sales_invoices = frappe.get_all(
+	return {
+		row.custom_xero_invoice_number: row
+		for row in frappe.get_all(
 			"Sales Invoice",
-			filters={"custom_xero_invoice_number": invoice_id},
-			fields=["name", "customer", "docstatus", "grand_total"],
-			limit=1,
+			filters={"custom_xero_invoice_number": ["in", list(keys)], "docstatus": ["!=", 2]},
+			fields=["name", "customer", "docstatus", "grand_total", "custom_xero_invoice_number"],
 		)
+	}
 
-		if not sales_invoices:
-			# Try to find by invoice number if ID search fails
-			sales_invoices = frappe.get_all(
-				"Sales Invoice",
-				filters={"custom_xero_invoice_number": invoice_number},
-				fields=["name", "customer", "docstatus", "grand_total"],
-				limit=1,
-			)
-
-		if not sales_invoices:
-			frappe.log_error(
-				f"No ERPNext invoice found for Xero invoice {invoice_id} ({invoice_number})",
-				"Voided Invoice Sync",
-			)
-			return
-
-		sales_invoice = sales_invoices[0]
 
-		# Check if invoice is already cancelled
-		if sales_invoice["docstatus"] == 2:
-			frappe.log_error(f"Invoice {sales_invoice['name']} is already cancelled", "Voided Invoice Sync")
-			return
+@traced("sales_invoice.cancel")
+def cancel_invoice_in_erpnext(sales_invoice, xero_invoice, source):
+	"""
+	Cancel a Sales Invoice voided in Xero.
 
-		# Check if invoice is not submitted
-		if sales_invoice["docstatus"] != 1:
-			frappe.log_error(
-				f"Invoice {sales_invoice['name']} is not submitted, cannot cancel", "Voided Invoice Sync"
-			)
-			return
+	Idempotent: the invoice row is locked and an invoice that is already cancelled, or
+	was never submitted, is left alone. Shared by the webhook and the scheduled sync;
+	returns whether the invoice was cancelled.
+	"""
+	docstatus = frappe.db.get_value("Sales Invoice", sales_invoice["name"], "docstatus", for_update=True)
 
-		# Cancel the invoice in ERPNext
-		cancel_invoice_in_erpnext(sales_invoice, invoice_id, invoice_number)
+	# Check if invoice is already cancelled
+	if docstatus == 2:
+		return False
 
-	except Exception as e:
+	# Check if invoice is not submitted
+	if docstatus != 1:
 		frappe.log_error(
-			f"Error processing voided invoice {xero_invoice.get('InvoiceID', 'Unknown')}: {str(e)}",
-			"Voided Invoice Sync",
+			f"Invoice {sales_invoice['name']} is not submitted, cannot cancel", "Voided Invoice Sync"
 		)
+		return False
 
-
-def cancel_invoice_in_erpnext(sales_invoice, xero_invoice_id, xero_invoice_number):
-	"""Cancel a sales invoice in ERPNext"""
-	try:
-		# Get the Sales Invoice document
+	# Cancel the invoice
+	with span("db.get_doc"):
 		sales_invoice_doc = frappe.get_doc("Sales Invoice", sales_invoice["name"])
-
-		# Cancel the invoice
+	with span("sales_invoice.cancel_doc"):
 		sales_invoice_doc.cancel()
 
-		# Add a comment about the cancellation
-		sales_invoice_doc.add_comment(
-			"Comment",
-			f"Invoice cancelled automatically via scheduler due to VOID status in Xero (Invoice ID: {xero_invoice_id}, Number: {xero_invoice_number})",
-		)
-
-		frappe.log_error(
-			f"Successfully cancelled invoice {sales_invoice['name']} due to VOID in Xero",
-			"Voided Invoice Sync Success",
-		)
+	# Add a comment about the cancellation
+	sales_invoice_doc.add_comment(
+		"Comment",
+		f"Invoice cancelled automatically via {source} due to VOID status in Xero (Invoice ID: {xero_invoice.get('InvoiceID')}, Number: {xero_invoice.get('InvoiceNumber')})",
+	)
 
-	except Exception as e:
-		frappe.log_error(f"Error cancelling invoice {sales_invoice['name']}: {str(e)}", "Voided Invoice Sync")
+	return True